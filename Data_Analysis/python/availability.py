@@ -0,0 +1,159 @@
+import json
+import os
+
+import pandas as pd
+
+from search import normalize_isbn
+
+STATE_VERSION = 2
+
+class AvailabilityIndex:
+    """
+    In-memory replacement for the AvailableBooks view at the circulation desk.
+
+    Books are addressable by BookID and ISBN (normalized, so hyphenated and
+    ISBN-10 input is found) through hash maps, and each book
+    keeps the set of its copies that are on the shelf, so lookups and the
+    checkout/return updates done by AfterLoanInsert/AfterLoanReturn are O(1)
+    instead of a grouped scan of BookCopies.
+    """
+
+    def __init__(self, books, book_copies):
+        self._books = {}
+        self._by_isbn = {}
+        for book_id, isbn, title, shelf in zip(books['BookID'].tolist(), books['ISBN'].tolist(),
+                                               books['Title'].tolist(), books['ShelfLocation'].tolist()):
+            self._books[book_id] = {'BookID': book_id, 'ISBN': isbn, 'Title': title, 'ShelfLocation': shelf}
+            if not pd.isna(isbn):
+                self._by_isbn[normalize_isbn(isbn)] = book_id
+        self._copy_book = dict(zip(book_copies['CopyID'].tolist(), book_copies['BookID'].tolist()))
+        self._copy_status = dict(zip(book_copies['CopyID'].tolist(), book_copies['Status'].astype(object).tolist()))
+        self._total = book_copies['BookID'].value_counts().to_dict()
+        self._rebuild_available()
+
+    def _rebuild_available(self):
+        self._available = {}
+        for copy_id, status in self._copy_status.items():
+            if status == 'Available':
+                self._available.setdefault(self._copy_book[copy_id], set()).add(copy_id)
+
+    def _book_id(self, book_id=None, isbn=None):
+        if isbn is not None:
+            if normalize_isbn(isbn) not in self._by_isbn:
+                raise KeyError(f"Unknown ISBN '{isbn}'")
+            return self._by_isbn[normalize_isbn(isbn)]
+        if book_id not in self._books:
+            raise KeyError(f"Unknown BookID {book_id}")
+        return book_id
+
+    def available_copies(self, book_id=None, isbn=None):
+        """
+        Number of copies of a book currently on the shelf
+        """
+        return len(self._available.get(self._book_id(book_id, isbn), ()))
+
+    def lookup(self, book_id=None, isbn=None):
+        """
+        Availability of one book, by BookID or ISBN: its title, shelf location
+        and available/total copy counts
+        """
+        book_id = self._book_id(book_id, isbn)
+        return dict(self._books[book_id],
+                    AvailableCopies=len(self._available.get(book_id, ())),
+                    TotalCopies=self._total.get(book_id, 0))
+
+    def checkout(self, book_id=None, isbn=None, copy_id=None):
+        """
+        Take a copy off the shelf: the given copy_id, which must be Available,
+        or any available copy of the book. Returns the CopyID checked out.
+        """
+        if copy_id is None:
+            book_id = self._book_id(book_id, isbn)
+            shelf = self._available.get(book_id)
+            if not shelf:
+                raise ValueError(f"No available copy of BookID {book_id}")
+            copy_id = next(iter(shelf))
+        elif copy_id not in self._copy_status:
+            raise KeyError(f"Unknown CopyID {copy_id}")
+        elif self._copy_status[copy_id] != 'Available':
+            raise ValueError(f"CopyID {copy_id} is {self._copy_status[copy_id]} and cannot be checked out")
+        self.set_status(copy_id, 'Borrowed')
+        return copy_id
+
+    def return_copy(self, copy_id):
+        """
+        Put a returned copy back on the shelf
+        """
+        self.set_status(copy_id, 'Available')
+
+    def set_status(self, copy_id, status):
+        """
+        Change one copy's status (e.g. 'Lost', 'Under Repair'), keeping the
+        available sets in step
+        """
+        if copy_id not in self._copy_status:
+            raise KeyError(f"Unknown CopyID {copy_id}")
+        book_id = self._copy_book[copy_id]
+        if status == 'Available':
+            self._available.setdefault(book_id, set()).add(copy_id)
+        else:
+            self._available.get(book_id, set()).discard(copy_id)
+        self._copy_status[copy_id] = status
+
+    def available_books(self):
+        """
+        The AvailableBooks view: BookID, Title, ISBN and AvailableCopies of
+        every book with at least one copy on the shelf
+        """
+        rows = [(book_id, self._books[book_id]['Title'], self._books[book_id]['ISBN'], len(copies))
+                for book_id, copies in self._available.items() if copies and book_id in self._books]
+        return pd.DataFrame(rows, columns=['BookID', 'Title', 'ISBN', 'AvailableCopies']).sort_values('BookID', ignore_index=True)
+
+    def snapshot(self):
+        """
+        Copy statuses as a plain dict, enough to restore() the index later
+        """
+        return dict(self._copy_status)
+
+    def restore(self, snapshot):
+        """
+        Reset every copy's status to a snapshot() taken earlier, which must
+        cover exactly the copies of the index
+        """
+        unknown = set(snapshot) - set(self._copy_status)
+        if unknown:
+            raise KeyError(f"Snapshot has unknown CopyIDs: {sorted(unknown)[:10]}")
+        missing = set(self._copy_status) - set(snapshot)
+        if missing:
+            raise KeyError(f"Snapshot is missing CopyIDs: {sorted(missing)[:10]}")
+        self._copy_status = dict(snapshot)
+        self._rebuild_available()
+
+    def save(self, path):
+        """
+        Persist the books, copies and copy statuses as JSON, replacing path atomically
+        """
+        books = list(self._books.values())
+        state = {
+            'version': STATE_VERSION,
+            'books': {col: [book[col] for book in books] for col in ['BookID', 'ISBN', 'Title', 'ShelfLocation']},
+            'CopyID': list(self._copy_status),
+            'BookID': [self._copy_book[copy_id] for copy_id in self._copy_status],
+            'Status': list(self._copy_status.values())
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore an index saved with save()
+        """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported availability state version {state.get('version')} in {path}")
+        copies = pd.DataFrame({'CopyID': state['CopyID'], 'BookID': state['BookID'], 'Status': state['Status']})
+        return cls(pd.DataFrame(state['books']), copies)
@@ -0,0 +1,162 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from create_df import compact_dataframes
+from generate_data import generate_library_data
+from profiling import DEFAULT_THRESHOLDS, StageProfiler, find_regressions
+from some_visualization import (build_report_frames, circulation_analysis, collection_analysis,
+                                fine_analysis, overdue_analysis, staff_analysis)
+
+# Stages of the analysis report, in execution order. Each stage runs one section
+# of some_visualization.py on the shared context dict and stores its outputs
+# back into it.
+
+def stage_joins(ctx):
+    """
+    Build book_info and loans_complete
+    """
+    ctx['book_info'], ctx['loans_complete'] = build_report_frames(ctx['data'])
+    return len(ctx['loans_complete'])
+
+def stage_collection(ctx):
+    """
+    Books by decade, category, author and publisher
+    """
+    ctx['collection'] = collection_analysis(ctx['data'], ctx['book_info'])
+    return len(ctx['book_info'])
+
+def stage_circulation(ctx):
+    """
+    Monthly circulation, popularity, member activity, durations and overdue share
+    """
+    ctx['circulation'] = circulation_analysis(ctx['loans_complete'])
+    ctx['overdue'] = overdue_analysis(ctx['loans_complete'])
+    return len(ctx['loans_complete'])
+
+def stage_fines(ctx):
+    """
+    Total, pending and collected fines
+    """
+    ctx['fines'] = fine_analysis(ctx['data']['fines'])
+    return len(ctx['data']['fines'])
+
+def stage_staff(ctx):
+    """
+    Loans processed per staff member
+    """
+    ctx['staff_loans'] = staff_analysis(ctx['loans_complete'], ctx['data']['staff'])
+    return len(ctx['staff_loans'])
+
+STAGES = [
+    ('joins', stage_joins),
+    ('collection', stage_collection),
+    ('circulation', stage_circulation),
+    ('fines', stage_fines),
+    ('staff', stage_staff)
+]
+
+def _profile_pass(scale, seed, selected, compact, trace_memory):
+    """
+    Generate the data at one scale and run the selected stages once under a
+    StageProfiler, returning its records
+    """
+    profiler = StageProfiler(trace_memory=trace_memory)
+    with profiler.stage('generate') as stage:
+        data = generate_library_data(scale=scale, seed=seed)
+        stage.rows = len(data['loans'])
+    if compact:
+        data = compact_dataframes(data)
+    for name, func in selected:
+        ctx = {'data': data}
+        # Stages depend on the joined frames, so rebuild them unprofiled
+        if name != 'joins':
+            stage_joins(ctx)
+        with profiler.stage(name) as stage:
+            stage.rows = func(ctx)
+    return profiler.records
+
+def run_benchmarks(scales=(0.01, 0.1, 1.0), seed=0, repeat=1, stages=None, compact=False, memory=True):
+    """
+    Profile data generation and every report stage at each scale factor.
+    Returns a JSON-serializable dict with one StageRecord dict (plus its scale)
+    per (scale, stage). Timings are the best of `repeat` untraced passes; peak
+    memory comes from one more pass under tracemalloc, skipped (None) with
+    memory=False. compact=True runs the stages on the compact table representation.
+    """
+    if repeat < 1:
+        raise ValueError(f"repeat must be at least 1, got {repeat}")
+    selected = [(name, func) for name, func in STAGES if stages is None or name in stages]
+    records = []
+    for scale in scales:
+        passes = [_profile_pass(scale, seed, selected, compact, trace_memory=False) for _ in range(repeat)]
+        traced = _profile_pass(scale, seed, selected, compact, trace_memory=True) if memory else None
+        for i, runs in enumerate(zip(*passes)):
+            record = dict(runs[0].to_dict(), scale=scale)
+            del record['start']
+            record['wall_seconds'] = min(run.wall_seconds for run in runs)
+            record['cpu_seconds'] = min(run.cpu_seconds for run in runs)
+            record['peak_bytes'] = traced[i].peak_bytes if memory else None
+            records.append(record)
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'seed': seed,
+        'repeat': repeat,
+        'compact': compact,
+        'stages': records
+    }
+
+def _at_scale(results, scale):
+    return {'stages': [record for record in results['stages'] if record['scale'] == scale]}
+
+def compare_results(baseline, current, thresholds=None):
+    """
+    profiling.find_regressions applied scale by scale: the stages of current
+    that regressed past their threshold, each tagged with its scale
+    """
+    regressions = []
+    for scale in sorted({record['scale'] for record in current['stages']}):
+        for regression in find_regressions(_at_scale(baseline, scale), _at_scale(current, scale), thresholds):
+            regressions.append(dict(regression, scale=scale))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the library analysis report at several scale factors')
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.01, 0.1, 1.0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+    parser.add_argument('--compact', action='store_true', help='Use the compact table representation')
+    parser.add_argument('--baseline', help='Previous results file; fail if a stage regressed')
+    parser.add_argument('--threshold', type=float, help='Regression ratio for every metric')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the extra tracemalloc run of every stage')
+    args = parser.parse_args()
+
+    results = run_benchmarks(scales=args.scales, seed=args.seed, repeat=args.repeat, compact=args.compact,
+                             memory=not args.no_memory)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for record in results['stages']:
+        memory = '' if record['peak_bytes'] is None else f"{record['peak_bytes'] / 2**20:9.1f} MiB"
+        print(f"{record['scale']:>8} {record['stage']:<12} {record['rows']:>10} rows "
+              f"{record['wall_seconds']:8.3f}s wall {record['cpu_seconds']:8.3f}s cpu {memory}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        thresholds = {metric: args.threshold for metric in DEFAULT_THRESHOLDS} if args.threshold else None
+        regressions = compare_results(baseline, results, thresholds)
+        for r in regressions:
+            print(f"{r['scale']:>8} {r['stage']:<12} {r['metric']}: {r['current']:.4g} vs {r['baseline']:.4g} "
+                  f"(x{r['ratio']:.2f} > x{r['threshold']})")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Bump when the drawing code changes so cached charts are redrawn
+CHART_VERSION = 1
+MANIFEST = '.chart_hashes.json'
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+def _pyplot():
+    """
+    Import pyplot on the non-interactive Agg backend, so rendering never needs a display
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use('seaborn-v0_8-whitegrid')
+    return plt, sns
+
+def draw_category(frame, plt, sns):
+    """
+    Books by Category; frame has Category and Count
+    """
+    plt.figure(figsize=(10, 6))
+    data = frame.sort_values('Count', ascending=False)
+    sns.barplot(x='Count', y='Category', hue='Category', data=data, palette='viridis', legend=False)
+    plt.title('Books by Category')
+
+def draw_authors(frame, plt, sns):
+    """
+    Top authors by number of books; frame has Author and Count
+    """
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='Count', y='Author', hue='Author', data=frame, palette='viridis', legend=False)
+    plt.title('Top Authors by Number of Books')
+
+def draw_monthly_circulation(frame, plt, sns):
+    """
+    Monthly circulation per year; frame has Year, Month and Count
+    """
+    plt.figure(figsize=(12, 6))
+    pivot = frame.pivot_table(index='Month', columns='Year', values='Count', aggfunc='sum')
+    pivot = pivot.reindex([month for month in MONTH_ORDER if month in pivot.index])
+    pivot.plot(kind='bar', ax=plt.gca())
+    plt.title('Monthly Circulation Trends')
+    plt.xlabel('Month')
+    plt.ylabel('Number of Loans')
+    plt.xticks(rotation=45)
+    plt.legend(title='Year')
+
+def draw_popular_books(frame, plt, sns):
+    """
+    Most borrowed books; frame has Title and Borrows
+    """
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x='Borrows', y='Title', hue='Title', data=frame, palette='viridis', legend=False)
+    plt.title('Most Popular Books')
+    plt.xlabel('Number of Borrows')
+    plt.ylabel('Book Title')
+
+def draw_loan_duration(frame, plt, sns):
+    """
+    Loan duration distribution; frame has DurationCategory and Count
+    """
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='DurationCategory', y='Count', hue='DurationCategory', data=frame, palette='viridis', legend=False)
+    plt.title('Loan Duration Distribution')
+    plt.xlabel('Loan Duration Category')
+    plt.ylabel('Number of Loans')
+    plt.xticks(rotation=45)
+
+def draw_loan_status(frame, plt, sns):
+    """
+    Loans per status; frame has Status and Count
+    """
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x='Status', y='Count', hue='Status', data=frame, palette='viridis', legend=False)
+    plt.title('Loan Status Overview')
+    plt.xlabel('Loan Status')
+    plt.ylabel('Number of Loans')
+
+# Chart name -> drawing function; each takes the chart's aggregate frame
+CHARTS = {
+    'category': draw_category,
+    'authors': draw_authors,
+    'monthly_circulation': draw_monthly_circulation,
+    'popular_books': draw_popular_books,
+    'loan_duration': draw_loan_duration,
+    'loan_status': draw_loan_status
+}
+
+def aggregate_hash(frame):
+    """
+    Hash of a chart's input aggregate (values, columns and dtypes)
+    """
+    frame = pd.DataFrame(frame)
+    digest = hashlib.sha1(f'v{CHART_VERSION}'.encode())
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def render_chart(name, frame, paths):
+    """
+    Draw one chart and save it to every path (the extension picks PNG or SVG)
+    """
+    plt, sns = _pyplot()
+    CHARTS[name](pd.DataFrame(frame), plt, sns)
+    plt.tight_layout()
+    for path in paths:
+        plt.savefig(path)
+    plt.close('all')
+    return name
+
+def _read_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def render_charts(aggregates, output_dir, formats=('png',), workers=None, force=False):
+    """
+    Render the charts named in aggregates (chart name -> aggregate frame) into
+    output_dir as '<name>.<format>' files.
+
+    Charts whose aggregate hash matches the last render and whose files still
+    exist are skipped unless force=True. The rest are drawn in parallel across
+    up to `workers` processes (default: one per CPU). Returns chart name ->
+    list of output paths for every requested chart.
+    """
+    unknown = [name for name in aggregates if name not in CHARTS]
+    if unknown:
+        raise ValueError(f"Unknown charts: {unknown}. Expected any of: {list(CHARTS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _read_manifest(output_dir)
+
+    outputs = {}
+    hashes = {}
+    pending = []
+    for name, frame in aggregates.items():
+        paths = [os.path.join(output_dir, f'{name}.{fmt}') for fmt in formats]
+        outputs[name] = paths
+        hashes[name] = aggregate_hash(frame)
+        cached = manifest.get(name, {}).get('hash') == hashes[name] and all(os.path.exists(path) for path in paths)
+        if force or not cached:
+            pending.append((name, frame, paths))
+
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(render_chart, *job) for job in pending]:
+                future.result()
+    else:
+        for job in pending:
+            render_chart(*job)
+
+    for name in aggregates:
+        manifest[name] = {'hash': hashes[name], 'files': outputs[name]}
+    tmp = os.path.join(output_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(output_dir, MANIFEST))
+    return outputs
@@ -1,19 +1,200 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-from datetime import datetime
-import io
-from collections import Counter
 
-# Set the style for our visualizations
-plt.style.use('seaborn-v0_8-whitegrid')
-sns.set_palette("viridis")
+# Column layout of each table in the data dict, mirroring sql/schema/create_DB.
+# 'dates' are parsed to datetime64 and 'dtypes' are applied explicitly so the
+# sample data and the database loader produce identically typed frames.
+# 'enums' (CHECK constraint values, or None to infer them) and 'money' (DECIMAL
+# columns) are only used by the opt-in compact representation. 'optional'
+# tables come from sql/schema/features.sql and may be missing from a database.
+TABLE_SCHEMA = {
+    'authors': {
+        'table': 'Authors',
+        'columns': ['AuthorID', 'FirstName', 'LastName', 'Biography', 'DateOfBirth', 'Nationality'],
+        'dates': ['DateOfBirth'],
+        'dtypes': {'AuthorID': 'int64'},
+        'enums': {'Nationality': None}
+    },
+    'publishers': {
+        'table': 'Publishers',
+        'columns': ['PublisherID', 'Name', 'Address', 'Phone', 'Email', 'Website'],
+        'dates': [],
+        'dtypes': {'PublisherID': 'int64'}
+    },
+    'categories': {
+        'table': 'Categories',
+        'columns': ['CategoryID', 'Name', 'Description'],
+        'dates': [],
+        'dtypes': {'CategoryID': 'int64'}
+    },
+    'books': {
+        'table': 'Books',
+        'columns': ['BookID', 'ISBN', 'Title', 'PublisherID', 'PublicationDate', 'Edition', 'Language', 'Pages', 'Description', 'ShelfLocation'],
+        'dates': ['PublicationDate'],
+        'dtypes': {'BookID': 'int64', 'PublisherID': 'Int64', 'Pages': 'Int64'},
+        'enums': {'Language': None}
+    },
+    'book_authors': {
+        'table': 'BookAuthors',
+        'columns': ['BookID', 'AuthorID'],
+        'dates': [],
+        'dtypes': {'BookID': 'int64', 'AuthorID': 'int64'}
+    },
+    'book_categories': {
+        'table': 'BookCategories',
+        'columns': ['BookID', 'CategoryID'],
+        'dates': [],
+        'dtypes': {'BookID': 'int64', 'CategoryID': 'int64'}
+    },
+    'members': {
+        'table': 'Members',
+        'columns': ['MemberID', 'FirstName', 'LastName', 'Email', 'Phone', 'Address', 'DateOfBirth', 'MembershipDate', 'MembershipExpiry', 'MembershipStatus'],
+        'dates': ['DateOfBirth', 'MembershipDate', 'MembershipExpiry'],
+        'dtypes': {'MemberID': 'int64'},
+        'enums': {'MembershipStatus': ['Active', 'Expired', 'Suspended', 'Cancelled']}
+    },
+    'staff': {
+        'table': 'Staff',
+        'columns': ['StaffID', 'FirstName', 'LastName', 'Email', 'Phone', 'Position', 'HireDate', 'Username', 'PasswordHash'],
+        'dates': ['HireDate'],
+        'dtypes': {'StaffID': 'int64'},
+        'enums': {'Position': None}
+    },
+    'book_copies': {
+        'table': 'BookCopies',
+        'columns': ['CopyID', 'BookID', 'AcquisitionDate', 'Price', 'Condition', 'Status'],
+        'dates': ['AcquisitionDate'],
+        'dtypes': {'CopyID': 'int64', 'BookID': 'int64', 'Price': 'float64'},
+        'enums': {'Condition': ['New', 'Good', 'Fair', 'Poor'], 'Status': ['Available', 'Borrowed', 'Reserved', 'Lost', 'Under Repair']},
+        'money': ['Price']
+    },
+    'loans': {
+        'table': 'Loans',
+        'columns': ['LoanID', 'BookID', 'MemberID', 'StaffID', 'CheckoutDate', 'DueDate', 'ReturnDate', 'Status'],
+        'dates': ['CheckoutDate', 'DueDate', 'ReturnDate'],
+        'dtypes': {'LoanID': 'int64', 'BookID': 'int64', 'MemberID': 'int64', 'StaffID': 'Int64'},
+        'enums': {'Status': ['Borrowed', 'Returned', 'Overdue', 'Lost']}
+    },
+    'reservations': {
+        'table': 'Reservations',
+        'columns': ['ReservationID', 'BookID', 'MemberID', 'ReservationDate', 'ExpiryDate', 'Status'],
+        'dates': ['ReservationDate', 'ExpiryDate'],
+        'dtypes': {'ReservationID': 'int64', 'BookID': 'int64', 'MemberID': 'int64'},
+        'enums': {'Status': ['Pending', 'Fulfilled', 'Cancelled', 'Expired']}
+    },
+    'fines': {
+        'table': 'Fines',
+        'columns': ['FineID', 'LoanID', 'MemberID', 'Amount', 'IssuedDate', 'PaymentDate', 'Status'],
+        'dates': ['IssuedDate', 'PaymentDate'],
+        'dtypes': {'FineID': 'int64', 'LoanID': 'int64', 'MemberID': 'int64', 'Amount': 'float64'},
+        'enums': {'Status': ['Pending', 'Paid', 'Waived']},
+        'money': ['Amount']
+    },
+    'book_reviews': {
+        'table': 'BookReviews',
+        'columns': ['ReviewID', 'BookID', 'MemberID', 'Rating', 'ReviewText', 'ReviewDate', 'IsApproved'],
+        'dates': ['ReviewDate'],
+        'dtypes': {'ReviewID': 'int64', 'BookID': 'int64', 'MemberID': 'int64', 'Rating': 'int64', 'IsApproved': 'boolean'},
+        'optional': True
+    },
+    'fine_payments': {
+        'table': 'FinePayments',
+        'columns': ['PaymentID', 'FineID', 'PaymentAmount', 'PaymentMethod', 'PaymentDate', 'ReceivedBy', 'TransactionReference', 'Notes'],
+        'dates': ['PaymentDate'],
+        'dtypes': {'PaymentID': 'int64', 'FineID': 'int64', 'PaymentAmount': 'float64', 'ReceivedBy': 'Int64'},
+        'enums': {'PaymentMethod': None},
+        'money': ['PaymentAmount'],
+        'optional': True
+    }
+}
+
+# Default number of rows fetched per round trip by the database loader
+DEFAULT_CHUNKSIZE = 50000
+
+def apply_schema_types(df, name):
+    """
+    Parse the declared date columns and cast the declared dtypes of a table frame
+    """
+    spec = TABLE_SCHEMA[name]
+    for col in spec['dates']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    dtypes = {col: dtype for col, dtype in spec['dtypes'].items() if col in df.columns}
+    return df.astype(dtypes) if dtypes else df
+
+# Fixed-point scale of compact money columns: DECIMAL(10, 2) stored as integer cents
+MONEY_SCALE = 100
+
+def _smallest_int_dtype(series):
+    """
+    Smallest signed integer dtype holding every value of an integer column,
+    keeping the nullable (capitalized) variant for nullable columns
+    """
+    nullable = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+    values = series.dropna()
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f'int{bits}')
+        if info.min <= low and high <= info.max:
+            return f'Int{bits}' if nullable else f'int{bits}'
+
+def compact_table(df, name):
+    """
+    Compact copy of one table frame: categoricals for enum-like columns, the
+    smallest integer types that fit, and money as integer cents in a
+    '<column>Cents' column (e.g. Amount -> AmountCents)
+    """
+    spec = TABLE_SCHEMA[name]
+    df = df.copy()
+    for col, values in spec.get('enums', {}).items():
+        if col in df.columns:
+            df[col] = pd.Categorical(df[col], categories=values) if values is not None else df[col].astype('category')
+    for col in spec.get('money', []):
+        if col in df.columns:
+            cents = (df[col] * MONEY_SCALE).round().astype('Int64')
+            df.insert(df.columns.get_loc(col), f'{col}Cents', cents if cents.isna().any() else cents.astype('int64'))
+            df = df.drop(columns=col)
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col].dtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(_smallest_int_dtype(df[col]))
+    return df
+
+def compact_dataframes(data):
+    """
+    Apply compact_table to every table of a data dict
+    """
+    return {name: compact_table(df, name) for name, df in data.items()}
+
+def money_column(df, col):
+    """
+    Dollar amounts of a money column as float64, whether the frame stores it as
+    floats (col) or as compact integer cents (col + 'Cents')
+    """
+    if col in df.columns:
+        return df[col].astype('float64')
+    return df[f'{col}Cents'].astype('float64') / MONEY_SCALE
+
+def memory_report(data, baseline=None):
+    """
+    Rows and deep memory usage per table; with a baseline data dict (e.g. the
+    non-compact frames) also the baseline bytes and the reduction factor
+    """
+    rows = []
+    for name, df in data.items():
+        row = {'Table': name, 'Rows': len(df), 'Bytes': int(df.memory_usage(deep=True).sum())}
+        if baseline is not None and name in baseline:
+            row['BaselineBytes'] = int(baseline[name].memory_usage(deep=True).sum())
+            row['Reduction'] = row['BaselineBytes'] / row['Bytes'] if row['Bytes'] else float('nan')
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    report['MiB'] = report['Bytes'] / 2**20
+    return report
 
 # Helper function to simulate loading data from SQL database
-def create_dataframes_from_data():
+def create_dataframes_from_data(compact=False):
     """
-    Create pandas DataFrames simulating the SQL tables based on the provided schema and sample data
+    Create pandas DataFrames simulating the SQL tables based on the provided schema and sample data.
+    With compact=True the frames use the compact representation of compact_table.
     """
     # Authors table
     authors_data = [
@@ -159,14 +340,28 @@ def create_dataframes_from_data():
     ]
     fines = pd.DataFrame(fines_data, columns=['FineID', 'LoanID', 'MemberID', 'Amount', 'IssuedDate', 'PaymentDate', 'Status'])
     
-    # Convert string dates to datetime objects
-    for df in [authors, books, members, staff, book_copies, loans, reservations, fines]:
-        for col in df.columns:
-            if 'Date' in col or col == 'DateOfBirth' or col == 'MembershipExpiry':
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='ignore')
+    # Book reviews table (IsApproved: moderator approval, see features.sql)
+    book_reviews_data = [
+        (1, 1, 1, 5, 'A magical start to the series.', '2023-06-16 09:00:00', 1),
+        (2, 1, 2, 4, 'Great fun, a little slow in the middle.', '2023-07-13 18:20:00', 1),
+        (3, 2, 3, 5, 'A timeless adventure.', '2023-07-18 20:05:00', 1),
+        (4, 3, 4, 4, 'Witty and sharp.', '2023-08-21 12:10:00', 1),
+        (5, 4, 3, 3, 'Scary, but too long.', '2023-07-01 16:40:00', 1),
+        (6, 5, 1, 5, 'Could not put it down.', '2023-07-31 21:15:00', 1),
+        (7, 4, 1, 2, 'Not for me.', '2023-09-02 10:30:00', 0),
+        (8, 2, 4, 1, 'Buy cheap books at my website!', '2023-09-10 08:00:00', 0)
+    ]
+    book_reviews = pd.DataFrame(book_reviews_data, columns=['ReviewID', 'BookID', 'MemberID', 'Rating', 'ReviewText', 'ReviewDate', 'IsApproved'])
+    
+    # Fine payments table (partial payments recorded by PayFine, see features.sql)
+    fine_payments_data = [
+        (1, 1, 6.00, 'Cash', '2023-07-05 11:30:00', 2, None, None),
+        (2, 2, 4.00, 'Cash', '2023-07-20 10:15:00', 3, None, 'Partial payment'),
+        (3, 3, 1.00, 'Credit Card', '2023-08-25 11:45:00', 1, 'TXN-20230825-0001', None)
+    ]
+    fine_payments = pd.DataFrame(fine_payments_data, columns=['PaymentID', 'FineID', 'PaymentAmount', 'PaymentMethod', 'PaymentDate', 'ReceivedBy', 'TransactionReference', 'Notes'])
     
-    return {
+    data = {
         'authors': authors,
         'publishers': publishers,
         'categories': categories,
@@ -178,8 +373,129 @@ def create_dataframes_from_data():
         'book_copies': book_copies,
         'loans': loans,
         'reservations': reservations,
-        'fines': fines
+        'fines': fines,
+        'book_reviews': book_reviews,
+        'fine_payments': fine_payments
     }
+    
+    # Convert string dates to datetime objects using the declared date columns
+    for name, df in data.items():
+        data[name] = apply_schema_types(df, name)
+    
+    return compact_dataframes(data) if compact else data
+
+def _select_columns(name, columns=None):
+    """
+    Validate a column projection against TABLE_SCHEMA, defaulting to every column
+    """
+    spec = TABLE_SCHEMA[name]
+    if columns is None:
+        return list(spec['columns'])
+    unknown = [col for col in columns if col not in spec['columns']]
+    if unknown:
+        raise ValueError(f"Unknown columns for table '{name}': {unknown}")
+    return list(columns)
+
+def iter_table_chunks(conn, name, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield one table from a DB-API connection as typed DataFrame chunks of at most
+    chunksize rows, so callers never hold the whole result as Python tuples
+    """
+    if name not in TABLE_SCHEMA:
+        raise KeyError(f"Unknown table '{name}'. Expected one of: {list(TABLE_SCHEMA)}")
+    spec = TABLE_SCHEMA[name]
+    cols = _select_columns(name, columns)
+    query = f"SELECT {', '.join(cols)} FROM {spec['table']}"
+    parse_dates = {col: {'errors': 'coerce'} for col in spec['dates'] if col in cols}
+    dtypes = {col: dtype for col, dtype in spec['dtypes'].items() if col in cols}
+    
+    for chunk in pd.read_sql_query(query, conn, parse_dates=parse_dates, dtype=dtypes, chunksize=chunksize):
+        # Columns that are NULL for a whole chunk come back as object; re-parse them
+        for col in parse_dates:
+            if not pd.api.types.is_datetime64_any_dtype(chunk[col]):
+                chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+        yield chunk
+
+def read_table(conn, name, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Read one table from a DB-API connection into a single typed DataFrame
+    """
+    chunks = list(iter_table_chunks(conn, name, columns=columns, chunksize=chunksize))
+    if not chunks:
+        empty = pd.DataFrame({col: pd.Series(dtype='object') for col in _select_columns(name, columns)})
+        return apply_schema_types(empty, name)
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    # A column that is NULL for a whole chunk comes back as object, which would
+    # turn the concatenated column into object too; restore the other chunks' type
+    for col in df.columns:
+        typed = {chunk[col].dtype for chunk in chunks if chunk[col].notna().any()}
+        if df[col].dtype == object and len(typed) == 1:
+            df[col] = df[col].astype(typed.pop())
+    return df
+
+def table_exists(conn, name):
+    """
+    Whether the SQL table of a TABLE_SCHEMA entry exists on a DB-API connection
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT 1 FROM {TABLE_SCHEMA[name]['table']} WHERE 1 = 0")
+        return True
+    except Exception:
+        return False
+    finally:
+        cursor.close()
+
+def available_tables(conn):
+    """
+    TABLE_SCHEMA keys present on a connection: every core table, plus the
+    optional ones the database actually has
+    """
+    return [name for name, spec in TABLE_SCHEMA.items() if not spec.get('optional') or table_exists(conn, name)]
+
+def load_dataframes_from_db(conn, tables=None, columns=None, chunksize=DEFAULT_CHUNKSIZE, compact=False):
+    """
+    Load the library tables from a DB-API connection (sqlite3 works as a local
+    stand-in for SQL Server) into the same dict of DataFrames returned by
+    create_dataframes_from_data.
+    
+    tables restricts which dict keys are loaded (default: available_tables) and
+    columns maps a dict key to the list of columns to select for that table;
+    unlisted tables load every column.
+    compact=True returns the compact representation of compact_table.
+    """
+    columns = columns or {}
+    names = list(tables) if tables is not None else available_tables(conn)
+    data = {}
+    for name in names:
+        df = read_table(conn, name, columns=columns.get(name), chunksize=chunksize)
+        data[name] = compact_table(df, name) if compact else df
+    return data
+
+def write_dataframes_to_db(data, conn, if_exists='replace'):
+    """
+    Write a dict of table DataFrames to a DB-API connection using the SQL table
+    names from TABLE_SCHEMA, e.g. to seed a local SQLite copy of the catalog
+    """
+    for name, df in data.items():
+        df.to_sql(TABLE_SCHEMA[name]['table'], conn, if_exists=if_exists, index=False)
+
+# The sample data is built on first access rather than at import time
+_data = None
+
+def get_data():
+    """
+    Return the sample data dict, building it on first use
+    """
+    global _data
+    if _data is None:
+        _data = create_dataframes_from_data()
+    return _data
 
-# Load data
-data = create_dataframes_from_data()
+def __getattr__(name):
+    # Keep `from create_df import data` working without building it at import
+    if name == 'data':
+        return get_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
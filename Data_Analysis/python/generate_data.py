@@ -0,0 +1,311 @@
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from create_df import TABLE_SCHEMA, apply_schema_types, write_dataframes_to_db
+
+# Row counts at scale factor 1.0; every table grows linearly with the scale
+# factor, so scale=100 gives roughly 1M members and 50M loans
+BASE_COUNTS = {
+    'authors': 1500,
+    'publishers': 50,
+    'books': 5000,
+    'members': 10000,
+    'staff': 20,
+    'loans': 500000,
+    'reservations': 25000,
+    'book_reviews': 50000
+}
+
+CATEGORY_NAMES = [
+    ('Fiction', 'Fictional literature including novels, short stories, etc.'),
+    ('Non-Fiction', 'Literature based on facts, real events, and real people'),
+    ('Science Fiction', 'Fiction based on imaginative concepts like futuristic science and technology'),
+    ('Fantasy', 'Fiction featuring magical and supernatural elements'),
+    ('Mystery', 'Fiction dealing with the solution of a crime or puzzle'),
+    ('Biography', 'Non-fictional account of a person\'s life'),
+    ('History', 'Non-fiction about past events'),
+    ('Self-Help', 'Books on personal development'),
+    ('Children\'s', 'Books for children'),
+    ('Young Adult', 'Books for teenagers and young adults')
+]
+
+NATIONALITIES = ['American', 'British', 'English', 'Canadian', 'Irish', 'Australian', 'French', 'German']
+LANGUAGES = ['English', 'Spanish', 'French', 'German']
+PAYMENT_METHODS = ['Cash', 'Credit Card', 'Debit Card', 'Online']
+POSITIONS = ['Head Librarian', 'Librarian', 'Assistant Librarian', 'Library Technician', 'Library Assistant']
+
+# Loan rules from create_DB and the CalculateOverdueFine trigger
+LOAN_PERIOD_DAYS = 14
+FINE_PER_DAY = 1.00
+RESERVATION_HOLD_DAYS = 7
+
+def _zipf_weights(n, exponent):
+    """
+    Normalized Zipf weights for n ranks, used for skewed popularity curves
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+def _skewed_choice(rng, ids, size, exponent):
+    """
+    Draw ids with a Zipf-like popularity curve over a random ranking of the ids
+    """
+    ranking = rng.permutation(ids)
+    return ranking[rng.choice(len(ids), size=size, p=_zipf_weights(len(ids), exponent))]
+
+def _random_dates(rng, start, end, size, unit='s'):
+    """
+    Uniform random datetime64 values in [start, end)
+    """
+    start = np.datetime64(start, unit)
+    end = np.datetime64(end, unit)
+    span = (end - start).astype(np.int64)
+    return start + rng.integers(0, span, size=size).astype(f'timedelta64[{unit}]')
+
+def _labels(prefix, ids):
+    """
+    Vectorized '<prefix><id>' strings
+    """
+    return prefix + pd.Series(ids).astype(str)
+
+def _bridge(rng, book_ids, target_ids, max_links):
+    """
+    Unique (BookID, target) pairs with 1..max_links distinct targets per book
+    """
+    links = rng.integers(1, max_links + 1, size=len(book_ids))
+    books = np.repeat(book_ids, links)
+    targets = rng.choice(target_ids, size=len(books))
+    pairs = pd.DataFrame({'BookID': books, 'Target': targets}).drop_duplicates()
+    return pairs.sort_values(['BookID', 'Target']).reset_index(drop=True)
+
+def generate_library_data(scale=1.0, seed=0, reference_date='2024-01-01', history_years=3,
+                          popularity_exponent=0.9, activity_exponent=0.8):
+    """
+    Generate all 14 library tables at the given scale factor with a seeded RNG.
+
+    The result has the same keys, columns and dtypes as create_dataframes_from_data,
+    respects every foreign key in sql/schema/create_DB and follows its status rules:
+    returned loans carry a ReturnDate, open loans are 'Borrowed' until DueDate and
+    'Overdue' afterwards, and late returns get a $1/day fine like the
+    CalculateOverdueFine trigger. Borrow counts follow a Zipf-like curve over books
+    (popularity_exponent) and members (activity_exponent).
+    """
+    rng = np.random.default_rng(seed)
+    counts = {name: max(1, int(round(count * scale))) for name, count in BASE_COUNTS.items()}
+    now = np.datetime64(reference_date, 's')
+    history_start = now - np.timedelta64(int(365 * history_years), 'D')
+
+    # Authors
+    author_ids = np.arange(1, counts['authors'] + 1)
+    authors = pd.DataFrame({
+        'AuthorID': author_ids,
+        'FirstName': _labels('Author', author_ids),
+        'LastName': _labels('Surname', author_ids),
+        'Biography': _labels('Biography of author', author_ids),
+        'DateOfBirth': _random_dates(rng, '1850-01-01', '2000-01-01', len(author_ids), 'D'),
+        'Nationality': rng.choice(NATIONALITIES, size=len(author_ids))
+    })
+
+    # Publishers
+    publisher_ids = np.arange(1, counts['publishers'] + 1)
+    publishers = pd.DataFrame({
+        'PublisherID': publisher_ids,
+        'Name': _labels('Publisher', publisher_ids),
+        'Address': _labels('Address of publisher', publisher_ids),
+        'Phone': _labels('555-', 1000 + publisher_ids),
+        'Email': 'info@publisher' + pd.Series(publisher_ids).astype(str) + '.com',
+        'Website': 'www.publisher' + pd.Series(publisher_ids).astype(str) + '.com'
+    })
+
+    # Categories
+    categories = pd.DataFrame(
+        [(i + 1, name, description) for i, (name, description) in enumerate(CATEGORY_NAMES)],
+        columns=TABLE_SCHEMA['categories']['columns']
+    )
+
+    # Books
+    book_ids = np.arange(1, counts['books'] + 1)
+    books = pd.DataFrame({
+        'BookID': book_ids,
+        'ISBN': pd.Series(9780000000000 + book_ids).astype(str),
+        'Title': _labels('Title', book_ids),
+        'PublisherID': rng.choice(publisher_ids, size=len(book_ids)),
+        'PublicationDate': _random_dates(rng, '1900-01-01', reference_date, len(book_ids), 'D'),
+        'Edition': rng.choice(['1st', '2nd', 'Reprint', 'Anniversary'], size=len(book_ids)),
+        'Language': rng.choice(LANGUAGES, size=len(book_ids), p=[0.85, 0.05, 0.05, 0.05]),
+        'Pages': rng.integers(80, 1200, size=len(book_ids)),
+        'Description': _labels('Description of book', book_ids),
+        'ShelfLocation': 'A' + pd.Series(book_ids % 50 + 1).astype(str) + '-S' + pd.Series(book_ids % 10 + 1).astype(str)
+    })
+
+    # BookAuthors and BookCategories (many-to-many bridges)
+    book_authors = _bridge(rng, book_ids, author_ids, 3).rename(columns={'Target': 'AuthorID'})
+    book_categories = _bridge(rng, book_ids, categories['CategoryID'].to_numpy(), 3).rename(columns={'Target': 'CategoryID'})
+
+    # Members
+    member_ids = np.arange(1, counts['members'] + 1)
+    membership_dates = _random_dates(rng, history_start.astype('datetime64[D]'), now.astype('datetime64[D]'), len(member_ids), 'D')
+    members = pd.DataFrame({
+        'MemberID': member_ids,
+        'FirstName': _labels('Member', member_ids),
+        'LastName': _labels('Surname', member_ids),
+        'Email': 'member' + pd.Series(member_ids).astype(str) + '@email.com',
+        'Phone': _labels('555-', member_ids),
+        'Address': _labels('Street', member_ids),
+        'DateOfBirth': _random_dates(rng, '1940-01-01', '2015-01-01', len(member_ids), 'D'),
+        'MembershipDate': membership_dates,
+        'MembershipExpiry': membership_dates + np.timedelta64(365, 'D'),
+        'MembershipStatus': rng.choice(['Active', 'Expired', 'Suspended', 'Cancelled'], size=len(member_ids), p=[0.85, 0.1, 0.03, 0.02])
+    })
+
+    # Staff
+    staff_ids = np.arange(1, counts['staff'] + 1)
+    staff = pd.DataFrame({
+        'StaffID': staff_ids,
+        'FirstName': _labels('Staff', staff_ids),
+        'LastName': _labels('Surname', staff_ids),
+        'Email': 'staff' + pd.Series(staff_ids).astype(str) + '@library.com',
+        'Phone': _labels('555-9', staff_ids),
+        'Position': rng.choice(POSITIONS, size=len(staff_ids)),
+        'HireDate': _random_dates(rng, '2010-01-01', reference_date, len(staff_ids), 'D'),
+        'Username': _labels('staff', staff_ids),
+        'PasswordHash': _labels('hashed_password_', staff_ids)
+    })
+
+    # BookCopies: at least one copy per book, more copies for popular books
+    copies_per_book = 1 + rng.poisson(1.5, size=len(book_ids))
+    copy_book_ids = np.repeat(book_ids, copies_per_book)
+    book_copies = pd.DataFrame({
+        'CopyID': np.arange(1, len(copy_book_ids) + 1),
+        'BookID': copy_book_ids,
+        'AcquisitionDate': _random_dates(rng, '2010-01-01', reference_date, len(copy_book_ids), 'D'),
+        'Price': np.round(rng.uniform(5, 40, size=len(copy_book_ids)), 2),
+        'Condition': rng.choice(['New', 'Good', 'Fair', 'Poor'], size=len(copy_book_ids), p=[0.3, 0.45, 0.2, 0.05]),
+        'Status': rng.choice(['Available', 'Borrowed', 'Reserved', 'Lost', 'Under Repair'], size=len(copy_book_ids), p=[0.7, 0.2, 0.05, 0.02, 0.03])
+    })
+
+    # Loans: skewed book popularity and member activity, checkouts in time order
+    n_loans = counts['loans']
+    checkout = np.sort(_random_dates(rng, history_start, now, n_loans))
+    due = checkout + np.timedelta64(LOAN_PERIOD_DAYS, 'D')
+    loan_days = rng.gamma(shape=3.0, scale=3.5, size=n_loans)
+    returned_at = checkout + (loan_days * 86400).astype('timedelta64[s]')
+    is_returned = returned_at < now
+    is_lost = ~is_returned & (rng.random(n_loans) < 0.01)
+    status = np.where(is_returned, 'Returned', np.where(due < now, 'Overdue', 'Borrowed'))
+    status = np.where(is_lost, 'Lost', status)
+    return_date = np.where(is_returned, returned_at, np.datetime64('NaT', 's'))
+    loans = pd.DataFrame({
+        'LoanID': np.arange(1, n_loans + 1),
+        'BookID': _skewed_choice(rng, book_ids, n_loans, popularity_exponent),
+        'MemberID': _skewed_choice(rng, member_ids, n_loans, activity_exponent),
+        'StaffID': rng.choice(staff_ids, size=n_loans),
+        'CheckoutDate': checkout,
+        'DueDate': due,
+        'ReturnDate': return_date,
+        'Status': status
+    })
+
+    # Reservations
+    reservation_dates = _random_dates(rng, history_start, now, counts['reservations'])
+    expiry_dates = reservation_dates + np.timedelta64(RESERVATION_HOLD_DAYS, 'D')
+    reservation_status = rng.choice(['Fulfilled', 'Cancelled', 'Expired'], size=len(reservation_dates), p=[0.7, 0.15, 0.15])
+    reservation_status = np.where(expiry_dates > now, 'Pending', reservation_status)
+    reservations = pd.DataFrame({
+        'ReservationID': np.arange(1, len(reservation_dates) + 1),
+        'BookID': _skewed_choice(rng, book_ids, len(reservation_dates), popularity_exponent),
+        'MemberID': rng.choice(member_ids, size=len(reservation_dates)),
+        'ReservationDate': reservation_dates,
+        'ExpiryDate': expiry_dates,
+        'Status': reservation_status
+    })
+
+    # Fines: one per late return, $1 per day late. Like DATEDIFF(DAY, ...) in
+    # the trigger, days late counts calendar-day boundaries crossed, so a
+    # return later on the due day itself still gets a $0 fine
+    late = loans['ReturnDate'].notna() & (loans['ReturnDate'] > loans['DueDate'])
+    late_loans = loans.loc[late]
+    days_late = (late_loans['ReturnDate'].dt.normalize() - late_loans['DueDate'].dt.normalize()).dt.days.to_numpy()
+    fine_status = rng.choice(['Pending', 'Paid', 'Waived'], size=len(late_loans), p=[0.3, 0.65, 0.05])
+    payment_delay = rng.integers(0, 30 * 86400, size=len(late_loans)).astype('timedelta64[s]')
+    payment_date = late_loans['ReturnDate'].to_numpy().astype('datetime64[s]') + payment_delay
+    fines = pd.DataFrame({
+        'FineID': np.arange(1, len(late_loans) + 1),
+        'LoanID': late_loans['LoanID'].to_numpy(),
+        'MemberID': late_loans['MemberID'].to_numpy(),
+        'Amount': days_late * FINE_PER_DAY,
+        'IssuedDate': late_loans['ReturnDate'].to_numpy(),
+        'PaymentDate': np.where((fine_status == 'Paid') & (payment_date < now), payment_date, np.datetime64('NaT', 's')),
+        'Status': np.where((fine_status == 'Paid') & (payment_date >= now), 'Pending', fine_status)
+    })
+
+    # Fine payments: every Paid fine above $0 was settled through PayFine, some
+    # of them in two installments (the first one between issue and settlement)
+    paid = fines[(fines['Status'] == 'Paid') & (fines['Amount'] > 0)]
+    amount = paid['Amount'].to_numpy()
+    split = (rng.random(len(paid)) < 0.2) & (amount >= 2)
+    first_amount = np.where(split, np.floor(amount / 2), amount)
+    issued = paid['IssuedDate'].to_numpy().astype('datetime64[s]')
+    settled = paid['PaymentDate'].to_numpy().astype('datetime64[s]')
+    installment = issued + ((settled - issued).astype('int64') * rng.random(len(paid))).astype('timedelta64[s]')
+    payment_dates = np.concatenate([np.where(split, installment, settled), settled[split]])
+    order = np.argsort(payment_dates, kind='stable')
+    payment_ids = np.arange(1, len(order) + 1)
+    payment_methods = rng.choice(PAYMENT_METHODS, size=len(order), p=[0.4, 0.3, 0.15, 0.15])
+    fine_payments = pd.DataFrame({
+        'PaymentID': payment_ids,
+        'FineID': np.concatenate([paid['FineID'].to_numpy(), paid['FineID'].to_numpy()[split]])[order],
+        'PaymentAmount': np.concatenate([first_amount, (amount - first_amount)[split]])[order],
+        'PaymentMethod': payment_methods,
+        'PaymentDate': payment_dates[order],
+        'ReceivedBy': rng.choice(staff_ids, size=len(order)),
+        'TransactionReference': np.where(payment_methods == 'Cash', None, 'TXN-' + payment_ids.astype(str)),
+        'Notes': None
+    })
+
+    # Book reviews: at most one per member and book, written soon after a return
+    returned = loans[loans['ReturnDate'].notna()]
+    reviewed = returned.sample(n=min(len(returned), counts['book_reviews'] * 2), random_state=rng)
+    reviewed = reviewed.drop_duplicates(['MemberID', 'BookID']).head(counts['book_reviews'])
+    review_delay = rng.integers(0, 7 * 86400, size=len(reviewed)).astype('timedelta64[s]')
+    book_reviews = pd.DataFrame({
+        'ReviewID': np.arange(1, len(reviewed) + 1),
+        'BookID': reviewed['BookID'].to_numpy(),
+        'MemberID': reviewed['MemberID'].to_numpy(),
+        'Rating': rng.choice([1, 2, 3, 4, 5], size=len(reviewed), p=[0.05, 0.1, 0.2, 0.35, 0.3]),
+        'ReviewText': ('Review of book ' + reviewed['BookID'].astype(str)).to_numpy(),
+        'ReviewDate': reviewed['ReturnDate'].to_numpy().astype('datetime64[s]') + review_delay,
+        'IsApproved': rng.random(len(reviewed)) < 0.9
+    })
+
+    data = {
+        'authors': authors,
+        'publishers': publishers,
+        'categories': categories,
+        'books': books,
+        'book_authors': book_authors,
+        'book_categories': book_categories,
+        'members': members,
+        'staff': staff,
+        'book_copies': book_copies,
+        'loans': loans,
+        'reservations': reservations,
+        'fines': fines,
+        'book_reviews': book_reviews,
+        'fine_payments': fine_payments
+    }
+    return {name: apply_schema_types(df[TABLE_SCHEMA[name]['columns']], name) for name, df in data.items()}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic library data into a SQLite database')
+    parser.add_argument('database', help='Path of the SQLite database to write')
+    parser.add_argument('--scale', type=float, default=1.0, help='Scale factor (1.0 = 10k members, 500k loans)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    write_dataframes_to_db(generate_library_data(scale=args.scale, seed=args.seed), conn)
+    conn.close()
@@ -0,0 +1,248 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from joins import author_names, lookup
+
+# Counters kept per sketch; the count error of any key is at most total / capacity
+DEFAULT_CAPACITY = 1000
+
+# What loans are counted by; categories and authors are reached through the bridges
+DIMENSIONS = ('books', 'members', 'categories', 'authors')
+
+STATE_VERSION = 1
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary of integer keys in fixed memory.
+
+    At most `capacity` keys are monitored. For each one, count is an upper bound
+    on its true count and count - error a lower bound; any key that is not
+    monitored occurred at most `floor` times. Both error and floor stay below
+    total / capacity. Summaries merge without losing these guarantees, so they
+    can be built per worker or per time window and combined later.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f"Sketch capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+        self.floor = 0
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, keys, weights=None):
+        """
+        Count a batch of keys (optionally weighted); nulls are ignored
+        """
+        keys = pd.Series(keys)
+        if weights is None:
+            batch = keys.dropna().astype('int64').value_counts()
+        else:
+            weights = pd.Series(np.asarray(weights, dtype='int64'), index=keys.index)
+            present = keys.notna()
+            batch = weights[present].groupby(keys[present].astype('int64').to_numpy()).sum()
+        exact = SpaceSaving(self.capacity)
+        exact.counts = batch.astype('int64')
+        exact.errors = pd.Series(0, index=batch.index, dtype='int64')
+        exact.total = int(batch.sum())
+        return self.merge(exact)
+
+    def merge(self, other):
+        """
+        Fold another summary into this one and return self
+        """
+        keys = self.counts.index.union(other.counts.index)
+        counts = self.counts.reindex(keys, fill_value=self.floor) + other.counts.reindex(keys, fill_value=other.floor)
+        errors = self.errors.reindex(keys, fill_value=self.floor) + other.errors.reindex(keys, fill_value=other.floor)
+        floor = self.floor + other.floor
+        if len(counts) > self.capacity:
+            # Keep the largest counters; a dropped key occurred at most its own count times
+            order = np.argsort(-counts.to_numpy(), kind='stable')
+            floor = max(floor, int(counts.iloc[order[self.capacity]]))
+            kept = np.sort(order[:self.capacity])
+            counts, errors = counts.iloc[kept], errors.iloc[kept]
+        self.counts = counts.astype('int64')
+        self.errors = errors.astype('int64')
+        self.floor = floor
+        self.total += other.total
+        return self
+
+    def top(self, n=10):
+        """
+        The n largest keys with Count (upper bound), Error and MinCount (lower
+        bound). Guaranteed marks keys whose lower bound beats every count that
+        could outrank them, i.e. that certainly belong to the top n.
+        """
+        order = np.argsort(-self.counts.to_numpy(), kind='stable')
+        top = pd.DataFrame({
+            'Key': self.counts.index.to_numpy()[order],
+            'Count': self.counts.to_numpy()[order],
+            'Error': self.errors.to_numpy()[order]
+        })
+        top['MinCount'] = top['Count'] - top['Error']
+        runner_up = max(int(top['Count'].iloc[n]) if len(top) > n else 0, self.floor)
+        top = top.head(n)
+        top['Guaranteed'] = top['MinCount'] >= runner_up
+        return top
+
+    def to_dict(self):
+        return {
+            'capacity': self.capacity,
+            'keys': self.counts.index.tolist(),
+            'counts': self.counts.tolist(),
+            'errors': self.errors.tolist(),
+            'floor': self.floor,
+            'total': self.total
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['capacity'])
+        index = pd.Index(np.asarray(state['keys'], dtype='int64'))
+        sketch.counts = pd.Series(np.asarray(state['counts'], dtype='int64'), index=index)
+        sketch.errors = pd.Series(np.asarray(state['errors'], dtype='int64'), index=index)
+        sketch.floor = state['floor']
+        sketch.total = state['total']
+        return sketch
+
+class LoanHeavyHitters:
+    """
+    Approximate top-N books, members, categories and authors by loans, kept in
+    one fixed-size Space-Saving sketch per dimension and time period.
+
+    Loans are bucketed by CheckoutDate into periods of `freq` ('M' month,
+    'W' week or 'D' day), so "top books this month" merges only the buckets in
+    that window. Memory grows with the number of periods, never with loan volume.
+    """
+
+    def __init__(self, book_categories, book_authors, capacity=DEFAULT_CAPACITY, freq='M'):
+        if freq not in ('M', 'W', 'D'):
+            raise ValueError(f"Unsupported period frequency '{freq}'. Expected 'M', 'W' or 'D'")
+        self.book_categories = book_categories[['BookID', 'CategoryID']]
+        self.book_authors = book_authors[['BookID', 'AuthorID']]
+        self.capacity = capacity
+        self.freq = freq
+        self.periods = {}
+
+    @classmethod
+    def from_data(cls, data, capacity=DEFAULT_CAPACITY, freq='M'):
+        """
+        Build the sketches from a data dict's Loans
+        """
+        sketches = cls(data['book_categories'], data['book_authors'], capacity, freq)
+        sketches.add_loans(data['loans'])
+        return sketches
+
+    def _period_start(self, period):
+        # Periods are labelled by their first day, so labels sort chronologically
+        return str(pd.Period(period, freq=self.freq).start_time.date())
+
+    def _bridge_counts(self, book_counts, bridge, key):
+        """
+        Loans per category/author: each book's loan count is credited to every
+        category/author it is linked to
+        """
+        links = bridge[bridge['BookID'].isin(book_counts.index)]
+        weights = book_counts.reindex(links['BookID'].to_numpy()).to_numpy()
+        return links[key].to_numpy(), weights
+
+    def add_loans(self, loans):
+        """
+        Count a batch of new loans (any chunk of the Loans table)
+        """
+        checkout = pd.to_datetime(loans['CheckoutDate'])
+        labels = checkout.dt.to_period(self.freq).dt.start_time.dt.date.astype(str).to_numpy()
+        for label in np.unique(labels):
+            chunk = loans[labels == label]
+            sketches = self.periods.setdefault(label, {name: SpaceSaving(self.capacity) for name in DIMENSIONS})
+            book_counts = chunk['BookID'].astype('int64').value_counts()
+            sketches['books'].update(book_counts.index, book_counts.to_numpy())
+            sketches['members'].update(chunk['MemberID'])
+            sketches['categories'].update(*self._bridge_counts(book_counts, self.book_categories, 'CategoryID'))
+            sketches['authors'].update(*self._bridge_counts(book_counts, self.book_authors, 'AuthorID'))
+
+    def merge(self, other):
+        """
+        Fold another LoanHeavyHitters (e.g. another worker's) into this one
+        """
+        if other.freq != self.freq:
+            raise ValueError(f"Cannot merge '{other.freq}' periods into '{self.freq}' periods")
+        for label, sketches in other.periods.items():
+            mine = self.periods.setdefault(label, {name: SpaceSaving(self.capacity) for name in DIMENSIONS})
+            for name in DIMENSIONS:
+                mine[name].merge(sketches[name])
+        return self
+
+    def window(self, dimension, start=None, end=None):
+        """
+        One sketch covering the periods that start within [start, end]
+        """
+        if dimension not in DIMENSIONS:
+            raise KeyError(f"Unknown dimension '{dimension}'. Expected one of: {list(DIMENSIONS)}")
+        start = self._period_start(start) if start is not None else None
+        end = str(pd.Timestamp(end).date()) if end is not None else None
+        sketch = SpaceSaving(self.capacity)
+        for label in sorted(self.periods):
+            if (start is None or label >= start) and (end is None or label <= end):
+                sketch.merge(self.periods[label][dimension])
+        return sketch
+
+    def top_books(self, books, n=10, start=None, end=None):
+        top = self.window('books', start, end).top(n)
+        top.insert(1, 'Title', lookup(books, 'BookID', 'Title', top['Key']))
+        return top.rename(columns={'Key': 'BookID', 'Count': 'Borrows'})
+
+    def top_members(self, members, n=10, start=None, end=None):
+        top = self.window('members', start, end).top(n)
+        first = lookup(members, 'MemberID', 'FirstName', top['Key'])
+        last = lookup(members, 'MemberID', 'LastName', top['Key'])
+        top.insert(1, 'FullName', pd.Series(first, dtype=object) + ' ' + pd.Series(last, dtype=object))
+        return top.rename(columns={'Key': 'MemberID', 'Count': 'Borrows'})
+
+    def top_categories(self, categories, n=10, start=None, end=None):
+        top = self.window('categories', start, end).top(n)
+        top.insert(1, 'Category', lookup(categories, 'CategoryID', 'Name', top['Key']))
+        return top.rename(columns={'Key': 'CategoryID', 'Count': 'Borrows'})
+
+    def top_authors(self, authors, n=10, start=None, end=None):
+        top = self.window('authors', start, end).top(n)
+        named = authors.assign(Author=author_names(authors))
+        top.insert(1, 'Author', lookup(named, 'AuthorID', 'Author', top['Key']))
+        return top.rename(columns={'Key': 'AuthorID', 'Count': 'Borrows'})
+
+    def save(self, path):
+        """
+        Persist the sketches as JSON, replacing path atomically
+        """
+        state = {
+            'version': STATE_VERSION,
+            'capacity': self.capacity,
+            'freq': self.freq,
+            'periods': {label: {name: sketch.to_dict() for name, sketch in sketches.items()}
+                        for label, sketches in self.periods.items()}
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, book_categories, book_authors):
+        """
+        Restore sketches saved with save(); the bridges are needed for new loans
+        """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported sketch state version {state.get('version')} in {path}")
+        sketches = cls(book_categories, book_authors, state['capacity'], state['freq'])
+        sketches.periods = {label: {name: SpaceSaving.from_dict(sketch) for name, sketch in period.items()}
+                            for label, period in state['periods'].items()}
+        return sketches
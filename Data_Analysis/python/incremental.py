@@ -0,0 +1,377 @@
+import calendar
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from create_df import money_column
+from joins import lookup
+
+# Loan duration bins and labels used by the circulation section of the report
+LOAN_DURATION_BINS = [0, 7, 14, 21, 28, float('inf')]
+LOAN_DURATION_LABELS = ['1 week or less', '1-2 weeks', '2-3 weeks', '3-4 weeks', 'More than 4 weeks']
+
+# Loan and fine statuses that can still change
+OPEN_LOAN_STATUSES = ('Borrowed', 'Overdue')
+OPEN_FINE_STATUSES = ('Pending',)
+
+# CalculateOverdueFine charges $1 per day late
+FINE_PER_DAY = 1.00
+
+STATE_VERSION = 1
+
+def _counts(values):
+    """
+    Counter of the non-null values of an array-like
+    """
+    counts = pd.Series(values).dropna().value_counts()
+    return Counter(dict(zip(counts.index.tolist(), counts.to_numpy().tolist())))
+
+def _sums(keys, amounts):
+    """
+    Counter of amount totals per key
+    """
+    totals = pd.Series(np.asarray(amounts, dtype='float64')).groupby(np.asarray(keys)).sum()
+    return Counter(dict(zip(totals.index.tolist(), totals.to_numpy().tolist())))
+
+def _duration_counts(checkout, returned):
+    """
+    Loan durations in whole days, their sum, and their per-bin counts
+    """
+    days = ((pd.Series(returned).reset_index(drop=True) - pd.Series(checkout).reset_index(drop=True)).dt.days).dropna()
+    bins = pd.cut(days, bins=LOAN_DURATION_BINS, labels=LOAN_DURATION_LABELS).value_counts()
+    return days, Counter({str(label): int(count) for label, count in bins.items()})
+
+def _nanoseconds(values):
+    """
+    Datetimes as a list of int64 nanoseconds since the epoch
+    """
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]').view('int64').tolist()
+
+class CirculationAggregates:
+    """
+    Circulation and fine rollups that are updated from appended Loans/Fines rows
+    and status transitions instead of being recomputed from the full history.
+
+    Only still-open loans (Borrowed/Overdue) and Pending fines are kept row by
+    row, since those are the only rows a later transition can touch; everything
+    else lives in counters, so each update costs time proportional to its delta.
+    """
+
+    def __init__(self):
+        self.loans_by_month = Counter()
+        self.loans_by_book = Counter()
+        self.loans_by_member = Counter()
+        self.loans_by_staff = Counter()
+        self.loan_status = Counter()
+        self.duration_bins = Counter()
+        self.duration_days = 0
+        self.duration_count = 0
+        self.fine_amounts = Counter()
+        self.fine_counts = Counter()
+        # Open loans as LoanID -> (MemberID, CheckoutDate, DueDate, Status), dates
+        # in int64 nanoseconds, and pending fines as FineID -> Amount
+        self._open_loans = {}
+        self._open_fines = {}
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Build the store from a full data dict (the one-time initial load)
+        """
+        store = cls()
+        store.add_loans(data['loans'])
+        store.add_fines(data['fines'])
+        return store
+
+    # ------------------------------------------------------------------ loans
+
+    def add_loans(self, loans):
+        """
+        Fold appended Loans rows into the rollups
+        """
+        if loans.empty:
+            return
+        checkout = pd.to_datetime(loans['CheckoutDate'])
+        months = checkout.dt.year.astype('int64') * 100 + checkout.dt.month.astype('int64')
+        self.loans_by_month.update(_counts(months))
+        self.loans_by_book.update(_counts(loans['BookID']))
+        self.loans_by_member.update(_counts(loans['MemberID']))
+        self.loans_by_staff.update(_counts(loans['StaffID']))
+        self.loan_status.update(_counts(loans['Status']))
+
+        returned = loans['ReturnDate'].notna()
+        if returned.any():
+            self._add_durations(checkout[returned], pd.to_datetime(loans.loc[returned, 'ReturnDate']))
+
+        is_open = loans['Status'].isin(OPEN_LOAN_STATUSES).to_numpy()
+        if is_open.any():
+            opened = loans[is_open]
+            self._open_loans.update(zip(
+                opened['LoanID'].to_numpy(dtype=np.int64).tolist(),
+                zip(opened['MemberID'].to_numpy(dtype=np.int64).tolist(),
+                    _nanoseconds(opened['CheckoutDate']),
+                    _nanoseconds(opened['DueDate']),
+                    opened['Status'].to_numpy(dtype=object).tolist())
+            ))
+
+    def _add_durations(self, checkout, returned):
+        days, bins = _duration_counts(checkout, returned)
+        self.duration_days += int(days.sum())
+        self.duration_count += int(len(days))
+        self.duration_bins.update(bins)
+
+    def update_loans(self, updates):
+        """
+        Apply status transitions of open loans, mirroring the AfterLoanReturn
+        trigger: updates has LoanID, Status and (for returns) ReturnDate.
+
+        Returns the fines the CalculateOverdueFine trigger would insert for late
+        returns (LoanID, MemberID, Amount); feed the Fines rows the database
+        actually created back through add_fines.
+        """
+        if updates.empty:
+            return pd.DataFrame(columns=['LoanID', 'MemberID', 'Amount'])
+        loan_ids = updates['LoanID'].to_numpy(dtype=np.int64)
+        current = [self._open_loans.get(loan_id) for loan_id in loan_ids.tolist()]
+        unknown = np.array([row is None for row in current], dtype=bool)
+        if unknown.any():
+            raise ValueError(f"Loans are not open and cannot change status: {loan_ids[unknown].tolist()}")
+
+        member_ids, checkout, due, status = (np.asarray(values) for values in zip(*current))
+        new_status = updates['Status'].to_numpy(dtype=object)
+        self.loan_status.subtract(_counts(status))
+        self.loan_status.update(_counts(new_status))
+
+        returning = new_status == 'Returned'
+        fines = pd.DataFrame(columns=['LoanID', 'MemberID', 'Amount'])
+        if returning.any():
+            if 'ReturnDate' not in updates or updates.loc[returning, 'ReturnDate'].isna().any():
+                raise ValueError("Returned loans need a ReturnDate")
+            return_dates = pd.to_datetime(updates['ReturnDate'].to_numpy()[returning])
+            self._add_durations(pd.to_datetime(checkout[returning]), return_dates)
+            due = pd.to_datetime(due[returning])
+            # DATEDIFF(DAY, ...) counts calendar-day boundaries crossed
+            days_late = np.asarray((return_dates.normalize() - due.normalize()).days)
+            late = np.asarray(return_dates > due)
+            fines = pd.DataFrame({
+                'LoanID': loan_ids[returning][late],
+                'MemberID': member_ids[returning][late],
+                'Amount': days_late[late] * FINE_PER_DAY
+            })
+
+        for loan_id, row, status in zip(loan_ids.tolist(), current, new_status.tolist()):
+            if status in OPEN_LOAN_STATUSES:
+                self._open_loans[loan_id] = row[:3] + (status,)
+            else:
+                self._open_loans.pop(loan_id, None)
+        self._compact_counters()
+        return fines
+
+    def mark_overdue(self, now=None):
+        """
+        Flip open Borrowed loans past their DueDate to Overdue, like the UPDATE
+        at the start of GenerateOverdueNotices. Returns the LoanIDs flipped.
+        """
+        now = (pd.Timestamp.now() if now is None else pd.Timestamp(now)).as_unit('ns').value
+        flipped = np.asarray([loan_id for loan_id, (_, _, due, status) in self._open_loans.items()
+                              if status == 'Borrowed' and due < now], dtype=np.int64)
+        if len(flipped):
+            self.update_loans(pd.DataFrame({'LoanID': flipped, 'Status': 'Overdue'}))
+        return flipped
+
+    def _open_loan_columns(self):
+        rows = list(self._open_loans.values())
+        member_ids, checkout, due, status = (list(values) for values in zip(*rows)) if rows else ([], [], [], [])
+        return {'LoanID': list(self._open_loans), 'MemberID': member_ids, 'CheckoutDate': checkout, 'DueDate': due, 'Status': status}
+
+    @property
+    def open_loans(self):
+        """
+        The still-open loans as a frame indexed by LoanID, built on demand
+        """
+        columns = self._open_loan_columns()
+        return pd.DataFrame({
+            'MemberID': np.asarray(columns['MemberID'], dtype=np.int64),
+            'CheckoutDate': np.asarray(columns['CheckoutDate'], dtype=np.int64).view('datetime64[ns]'),
+            'DueDate': np.asarray(columns['DueDate'], dtype=np.int64).view('datetime64[ns]'),
+            'Status': np.asarray(columns['Status'], dtype=object)
+        }, index=pd.Index(columns['LoanID'], dtype='int64', name='LoanID'))
+
+    # ------------------------------------------------------------------ fines
+
+    def add_fines(self, fines):
+        """
+        Fold appended Fines rows into the fine totals
+        """
+        if fines.empty:
+            return
+        amounts = money_column(fines, 'Amount')
+        self.fine_amounts.update(_sums(fines['Status'], amounts))
+        self.fine_counts.update(_counts(fines['Status']))
+        pending = fines['Status'].isin(OPEN_FINE_STATUSES).to_numpy()
+        if pending.any():
+            self._open_fines.update(zip(fines['FineID'].to_numpy(dtype=np.int64)[pending].tolist(),
+                                        amounts.to_numpy()[pending].tolist()))
+
+    def update_fines(self, updates):
+        """
+        Apply Pending -> Paid/Waived transitions; updates has FineID and Status
+        """
+        if updates.empty:
+            return
+        fine_ids = updates['FineID'].to_numpy(dtype=np.int64)
+        unknown = np.array([fine_id not in self._open_fines for fine_id in fine_ids.tolist()], dtype=bool)
+        if unknown.any():
+            raise ValueError(f"Fines are not pending and cannot change status: {fine_ids[unknown].tolist()}")
+        amounts = np.asarray([self._open_fines[fine_id] for fine_id in fine_ids.tolist()], dtype='float64')
+        new_status = updates['Status'].to_numpy(dtype=object)
+        self.fine_amounts.subtract({'Pending': float(amounts.sum())})
+        self.fine_counts.subtract({'Pending': len(amounts)})
+        self.fine_amounts.update(_sums(new_status, amounts))
+        self.fine_counts.update(_counts(new_status))
+        for fine_id, status in zip(fine_ids.tolist(), new_status.tolist()):
+            if status not in OPEN_FINE_STATUSES:
+                self._open_fines.pop(fine_id, None)
+        self._compact_counters()
+
+    @property
+    def open_fines(self):
+        """
+        The pending fine amounts as a series indexed by FineID, built on demand
+        """
+        return pd.Series(list(self._open_fines.values()), dtype='float64',
+                         index=pd.Index(list(self._open_fines), dtype='int64', name='FineID'), name='Amount')
+
+    def _compact_counters(self):
+        for counter in (self.loan_status, self.fine_counts):
+            for key in [key for key, value in counter.items() if value == 0]:
+                del counter[key]
+
+    # ---------------------------------------------------------------- results
+
+    def monthly_circulation(self):
+        """
+        Year, Month, Count and Month_Num rows as in the report's loans_by_month
+        """
+        rows = [(key // 100, calendar.month_name[key % 100], count, key % 100)
+                for key, count in sorted(self.loans_by_month.items())]
+        return pd.DataFrame(rows, columns=['Year', 'Month', 'Count', 'Month_Num'])
+
+    def book_popularity(self, books):
+        """
+        Borrows per book title, most borrowed first
+        """
+        counts = pd.Series(self.loans_by_book, dtype='int64')
+        titles = lookup(books, 'BookID', 'Title', counts.index.to_numpy())
+        popularity = pd.DataFrame({'Title': titles, 'Borrows': counts.to_numpy()})
+        popularity = popularity.groupby('Title', as_index=False)['Borrows'].sum()
+        return popularity.sort_values('Borrows', ascending=False, kind='stable')
+
+    def borrower_activity(self, members):
+        """
+        Borrows per member with their full name, most active first
+        """
+        counts = pd.Series(self.loans_by_member, dtype='int64')
+        ids = counts.index.to_numpy()
+        activity = pd.DataFrame({
+            'MemberID': ids,
+            'FirstName': lookup(members, 'MemberID', 'FirstName', ids),
+            'LastName': lookup(members, 'MemberID', 'LastName', ids),
+            'Borrows': counts.to_numpy()
+        }).sort_values('Borrows', ascending=False, kind='stable')
+        activity['FullName'] = activity['FirstName'] + ' ' + activity['LastName']
+        return activity
+
+    def staff_loans(self, staff):
+        """
+        Loans processed per staff member, busiest first
+        """
+        counts = pd.Series(self.loans_by_staff, dtype='int64')
+        ids = counts.index.to_numpy()
+        result = pd.DataFrame({
+            'StaffID': ids,
+            'ProcessedLoans': counts.to_numpy(),
+            'FirstName': lookup(staff, 'StaffID', 'FirstName', ids),
+            'LastName': lookup(staff, 'StaffID', 'LastName', ids)
+        })
+        result['FullName'] = result['FirstName'] + ' ' + result['LastName']
+        return result.sort_values('ProcessedLoans', ascending=False, kind='stable')
+
+    def duration_distribution(self):
+        """
+        Returned loans per duration bin, in bin order
+        """
+        return pd.Series([self.duration_bins.get(label, 0) for label in LOAN_DURATION_LABELS],
+                         index=LOAN_DURATION_LABELS, name='count')
+
+    def average_loan_duration(self):
+        return self.duration_days / self.duration_count if self.duration_count else float('nan')
+
+    def overdue_share(self):
+        """
+        Overdue loan count and its percentage of all loans
+        """
+        total = sum(self.loan_status.values())
+        overdue = self.loan_status.get('Overdue', 0)
+        return overdue, (overdue / total * 100) if total else 0.0
+
+    def fine_totals(self):
+        """
+        Total, pending and collected fine amounts
+        """
+        return {
+            'total': float(sum(self.fine_amounts.values())),
+            'pending': float(self.fine_amounts.get('Pending', 0.0)),
+            'collected': float(self.fine_amounts.get('Paid', 0.0))
+        }
+
+    # ------------------------------------------------------------ persistence
+
+    def save(self, path):
+        """
+        Persist the store as JSON, replacing path atomically
+        """
+        state = {
+            'version': STATE_VERSION,
+            'loans_by_month': self.loans_by_month,
+            'loans_by_book': self.loans_by_book,
+            'loans_by_member': self.loans_by_member,
+            'loans_by_staff': self.loans_by_staff,
+            'loan_status': self.loan_status,
+            'duration_bins': self.duration_bins,
+            'duration_days': self.duration_days,
+            'duration_count': self.duration_count,
+            'fine_amounts': self.fine_amounts,
+            'fine_counts': self.fine_counts,
+            'open_loans': self._open_loan_columns(),
+            'open_fines': {'FineID': list(self._open_fines), 'Amount': list(self._open_fines.values())}
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({key: (dict(value) if isinstance(value, Counter) else value) for key, value in state.items()}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore a store saved with save()
+        """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported aggregate state version {state.get('version')} in {path}")
+        store = cls()
+        for name in ('loans_by_month', 'loans_by_book', 'loans_by_member', 'loans_by_staff'):
+            setattr(store, name, Counter({int(key): value for key, value in state[name].items()}))
+        for name in ('loan_status', 'duration_bins', 'fine_amounts', 'fine_counts'):
+            setattr(store, name, Counter(state[name]))
+        store.duration_days = state['duration_days']
+        store.duration_count = state['duration_count']
+        open_loans = state['open_loans']
+        store._open_loans = dict(zip(open_loans['LoanID'], zip(open_loans['MemberID'], open_loans['CheckoutDate'],
+                                                               open_loans['DueDate'], open_loans['Status'])))
+        store._open_fines = dict(zip(state['open_fines']['FineID'], state['open_fines']['Amount']))
+        return store
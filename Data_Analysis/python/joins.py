@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+# Columns the loans fact can carry besides the Loans columns themselves, mapped
+# to (dimension, source column). 'book' columns come from build_book_dimension,
+# so they include the Author/Category bridge labels and the Publisher name.
+FACT_COLUMNS = {
+    'FirstName': ('members', 'FirstName'),
+    'LastName': ('members', 'LastName'),
+    'Email': ('members', 'Email'),
+    'Phone': ('members', 'Phone'),
+    'Address': ('members', 'Address'),
+    'DateOfBirth': ('members', 'DateOfBirth'),
+    'MembershipDate': ('members', 'MembershipDate'),
+    'MembershipExpiry': ('members', 'MembershipExpiry'),
+    'MembershipStatus': ('members', 'MembershipStatus'),
+    'Title': ('book', 'Title'),
+    'ISBN': ('book', 'ISBN'),
+    'PublisherID': ('book', 'PublisherID'),
+    'PublicationDate': ('book', 'PublicationDate'),
+    'Language': ('book', 'Language'),
+    'ShelfLocation': ('book', 'ShelfLocation'),
+    'Author': ('book', 'Author'),
+    'Category': ('book', 'Category'),
+    'Publisher': ('book', 'Publisher'),
+    'StaffFirstName': ('staff', 'FirstName'),
+    'StaffLastName': ('staff', 'LastName'),
+    'StaffPosition': ('staff', 'Position')
+}
+
+# The columns some_visualization.py reads from loans_complete
+DEFAULT_FACT_COLUMNS = ['FirstName', 'LastName', 'Title', 'Author', 'Publisher']
+
+# Derived book columns resolved through a bridge or a second dimension
+BOOK_DERIVED_COLUMNS = ['Author', 'Category', 'Publisher']
+
+def key_positions(keys, ids):
+    """
+    Row position of every key within the dimension key column ids, or -1 where
+    the key is missing or null. Small dense integer keys use a direct array
+    lookup; anything else falls back to a hash index.
+    """
+    keys = pd.Series(keys)
+    ids = pd.Series(ids)
+    null = keys.isna().to_numpy()
+    key_values = keys.to_numpy(dtype=np.int64, na_value=-1) if pd.api.types.is_integer_dtype(keys.dtype) else None
+    id_values = ids.to_numpy(dtype=np.int64) if pd.api.types.is_integer_dtype(ids.dtype) and not ids.isna().any() else None
+    if key_values is not None and id_values is not None and len(id_values) and id_values.min() >= 0 \
+            and id_values.max() <= 4 * len(id_values) + 1024:
+        lookup = np.full(id_values.max() + 1, -1, dtype=np.int64)
+        lookup[id_values] = np.arange(len(id_values))
+        in_range = ~null & (key_values >= 0) & (key_values < len(lookup))
+        positions = np.full(len(key_values), -1, dtype=np.int64)
+        positions[in_range] = lookup[key_values[in_range]]
+        return positions
+    positions = pd.Index(ids).get_indexer(keys)
+    positions[null] = -1
+    return positions
+
+def take_column(values, positions):
+    """
+    Gather values at positions, filling -1 positions with the column's null value
+    """
+    return pd.api.extensions.take(pd.Series(values).array, positions, allow_fill=True)
+
+def lookup(dimension, key, column, keys):
+    """
+    Resolve keys against dimension[key] and return the matching dimension[column]
+    values as an array aligned with keys
+    """
+    return take_column(dimension[column], key_positions(keys, dimension[key]))
+
+def bridge_labels(bridge, dimension, key, labels, sep=', '):
+    """
+    Collapse a many-to-many bridge (BookAuthors, BookCategories) into one label
+    string per BookID, so joining it never multiplies the book rows
+    """
+    names = take_column(labels, key_positions(bridge[key], dimension[key]))
+    pairs = pd.DataFrame({'BookID': bridge['BookID'].to_numpy(), 'Label': names}).dropna()
+    return pairs.groupby('BookID', sort=True)['Label'].agg(sep.join)
+
+def author_names(authors):
+    """
+    Full author names in row order of the authors frame
+    """
+    return authors['FirstName'] + ' ' + authors['LastName']
+
+def build_book_dimension(data, columns=None):
+    """
+    One row per book with the requested Books columns plus any of the derived
+    columns Author (all authors, comma-separated), Category and Publisher.
+    Books without authors, categories or a publisher keep their row with a null.
+    """
+    books = data['books']
+    columns = list(columns) if columns is not None else ['Title', 'ISBN', 'PublicationDate'] + BOOK_DERIVED_COLUMNS
+    dimension = pd.DataFrame({'BookID': books['BookID'].to_numpy()})
+    for col in columns:
+        if col == 'BookID':
+            continue
+        if col == 'Author':
+            labels = bridge_labels(data['book_authors'], data['authors'], 'AuthorID', author_names(data['authors']))
+            dimension[col] = lookup(labels.rename('Author').reset_index(), 'BookID', 'Author', dimension['BookID'])
+        elif col == 'Category':
+            labels = bridge_labels(data['book_categories'], data['categories'], 'CategoryID', data['categories']['Name'])
+            dimension[col] = lookup(labels.rename('Category').reset_index(), 'BookID', 'Category', dimension['BookID'])
+        elif col == 'Publisher':
+            dimension[col] = lookup(data['publishers'], 'PublisherID', 'Name', books['PublisherID'])
+        elif col in books.columns:
+            dimension[col] = books[col].to_numpy()
+        else:
+            raise ValueError(f"Unknown book column '{col}'")
+    return dimension
+
+def build_loans_fact(data, columns=None, loans=None):
+    """
+    Denormalize Loans against the member, book (with authors, categories and
+    publisher) and staff dimensions in a single pass.
+
+    Every dimension is resolved with one integer-key position lookup and only
+    the requested columns (see FACT_COLUMNS, default DEFAULT_FACT_COLUMNS) are
+    gathered, so the result has exactly one row per loan and no intermediate
+    wide frames. Loans whose book, member or staff row is missing keep nulls.
+    loans overrides data['loans'], e.g. to build the fact for one chunk.
+    """
+    loans = data['loans'] if loans is None else loans
+    columns = list(columns) if columns is not None else DEFAULT_FACT_COLUMNS
+    unknown = [col for col in columns if col not in FACT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fact columns: {unknown}. Expected any of: {list(FACT_COLUMNS)}")
+
+    fact = loans.copy()
+    by_dimension = {}
+    for col in columns:
+        dimension, source = FACT_COLUMNS[col]
+        by_dimension.setdefault(dimension, []).append((col, source))
+
+    for dimension, wanted in by_dimension.items():
+        if dimension == 'book':
+            table = build_book_dimension(data, [source for _, source in wanted])
+            key, fact_key = 'BookID', 'BookID'
+        elif dimension == 'members':
+            table, key, fact_key = data['members'], 'MemberID', 'MemberID'
+        else:
+            table, key, fact_key = data['staff'], 'StaffID', 'StaffID'
+        positions = key_positions(fact[fact_key], table[key])
+        for col, source in wanted:
+            fact[col] = take_column(table[source], positions)
+    return fact
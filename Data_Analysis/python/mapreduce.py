@@ -0,0 +1,174 @@
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from charts import MONTH_ORDER
+from incremental import LOAN_DURATION_LABELS, CirculationAggregates
+from streaming import (DEFAULT_MEMORY_BUDGET, DIMENSION_COLUMNS, FINE_COLUMNS, LOAN_COLUMNS, load_dimensions,
+                       stream_aggregates)
+
+# Counter-valued fields of a partial result; merging adds them key by key
+COUNTER_FIELDS = ['loans_by_month', 'books', 'members', 'staff', 'loan_status', 'duration_bins', 'fine_amounts']
+SCALAR_FIELDS = ['duration_days', 'duration_count']
+
+def _series_counter(keys, values):
+    return Counter(dict(zip(keys, values.tolist())))
+
+def partial_from_store(branch, store, dimensions, top_n=None):
+    """
+    Turn one partition's CirculationAggregates into a mergeable partial result.
+
+    Books are keyed by Title and members/staff by (branch, ID, full name), since
+    IDs are only unique within one branch database. Partitions of a single
+    library pass branch=None, so a member or staff member whose loans span
+    several partitions is merged back into one entry. With top_n, the book and
+    member counters keep only their top_n candidates; that is exact when the
+    partitions split Loans by that key (each book or member lives in exactly one
+    partition) and an approximation otherwise.
+    """
+    books = store.book_popularity(dimensions['books'])
+    members = store.borrower_activity(dimensions['members'])
+    staff = store.staff_loans(dimensions['staff'])
+    partial = {
+        'loans_by_month': Counter(store.loans_by_month),
+        'books': _series_counter(books['Title'].tolist(), books['Borrows']),
+        'members': _series_counter(list(zip([branch] * len(members), members['MemberID'].tolist(), members['FullName'].tolist())), members['Borrows']),
+        'staff': _series_counter(list(zip([branch] * len(staff), staff['StaffID'].tolist(), staff['FullName'].tolist())), staff['ProcessedLoans']),
+        'loan_status': Counter(store.loan_status),
+        'duration_bins': Counter(store.duration_bins),
+        'fine_amounts': Counter(store.fine_amounts),
+        'duration_days': store.duration_days,
+        'duration_count': store.duration_count
+    }
+    if top_n is not None:
+        partial['books'] = Counter(dict(partial['books'].most_common(top_n)))
+        partial['members'] = Counter(dict(partial['members'].most_common(top_n)))
+    return partial
+
+def analyse_partition(branch, source, top_n=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Map step: analyse one branch or partition into a partial result (branch is
+    None for a partition of a single library, see partial_from_store).
+
+    source is a data dict, a snapshot directory, or the path of a SQLite copy
+    of the branch database; the latter two are streamed in bounded chunks.
+    """
+    if isinstance(source, dict):
+        return partial_from_store(branch, CirculationAggregates.from_data(source), source, top_n)
+    if os.path.isdir(source):
+        return partial_from_store(branch, stream_aggregates(source, memory_budget), load_dimensions(source), top_n)
+    conn = sqlite3.connect(source)
+    try:
+        return partial_from_store(branch, stream_aggregates(conn, memory_budget), load_dimensions(conn), top_n)
+    finally:
+        conn.close()
+
+def merge_partials(partials):
+    """
+    Reduce step: add partial results together
+    """
+    merged = {field: Counter() for field in COUNTER_FIELDS}
+    merged.update({field: 0 for field in SCALAR_FIELDS})
+    for partial in partials:
+        for field in COUNTER_FIELDS:
+            merged[field].update(partial[field])
+        for field in SCALAR_FIELDS:
+            merged[field] += partial[field]
+    return merged
+
+def _project(df, columns):
+    # Keep the listed columns, including compact '<column>Cents' money columns
+    return df[[col for col in df.columns if col in columns or col.removesuffix('Cents') in columns]]
+
+def partition_data(data, key='MemberID', partitions=None):
+    """
+    Hash-partition one data dict's Loans (and their Fines) by MemberID or BookID.
+
+    Each partition holds only what analyse_partition reads: its Loans and Fines
+    rows and the books/members/staff label columns, so a worker process is not
+    sent the rest of the catalog. Pass partitioned=True to
+    run_consortium_analysis to merge the partitions as one library.
+    """
+    if key not in ('MemberID', 'BookID'):
+        raise ValueError("Loans can be partitioned by 'MemberID' or 'BookID'")
+    partitions = partitions or os.cpu_count() or 1
+    bucket = data['loans'][key].to_numpy(dtype=np.int64) % partitions
+    loan_bucket = pd.Series(bucket, index=data['loans']['LoanID'].to_numpy())
+    fine_bucket = loan_bucket.reindex(data['fines']['LoanID'].to_numpy()).fillna(0).to_numpy(dtype=np.int64)
+    loans, fines = _project(data['loans'], LOAN_COLUMNS), _project(data['fines'], FINE_COLUMNS)
+    dimensions = {name: _project(data[name], columns) for name, columns in DIMENSION_COLUMNS.items()}
+    parts = []
+    for part in range(partitions):
+        parts.append(dict(dimensions, loans=loans[bucket == part].reset_index(drop=True),
+                          fines=fines[fine_bucket == part].reset_index(drop=True)))
+    return parts
+
+def consortium_report(merged, top_n=None, partitioned=False):
+    """
+    Final report figures from merged partials, shaped like the report's sections.
+    Member and staff lists carry a Branch column unless the partials are
+    partitions of a single library.
+    """
+    months = sorted(merged['loans_by_month'].items())
+    loans_by_month = pd.DataFrame(
+        [(key // 100, MONTH_ORDER[key % 100 - 1], count, key % 100) for key, count in months],
+        columns=['Year', 'Month', 'Count', 'Month_Num']
+    )
+    books = merged['books'].most_common(top_n)
+    book_popularity = pd.DataFrame(books, columns=['Title', 'Borrows'])
+    members = merged['members'].most_common(top_n)
+    borrower_activity = pd.DataFrame(
+        [(branch, member_id, name, count) for (branch, member_id, name), count in members],
+        columns=['Branch', 'MemberID', 'FullName', 'Borrows']
+    )
+    staff_loans = pd.DataFrame(
+        [(branch, staff_id, name, count) for (branch, staff_id, name), count in merged['staff'].most_common()],
+        columns=['Branch', 'StaffID', 'FullName', 'ProcessedLoans']
+    )
+    if partitioned:
+        borrower_activity = borrower_activity.drop(columns='Branch')
+        staff_loans = staff_loans.drop(columns='Branch')
+    total_loans = sum(merged['loan_status'].values())
+    overdue_count = merged['loan_status'].get('Overdue', 0)
+    fines = merged['fine_amounts']
+    return {
+        'loans_by_month': loans_by_month,
+        'book_popularity': book_popularity,
+        'borrower_activity': borrower_activity,
+        'staff_loans': staff_loans,
+        'average_loan_duration': merged['duration_days'] / merged['duration_count'] if merged['duration_count'] else float('nan'),
+        'duration_distribution': pd.Series([merged['duration_bins'].get(label, 0) for label in LOAN_DURATION_LABELS],
+                                           index=LOAN_DURATION_LABELS, name='count'),
+        'overdue_count': overdue_count,
+        'overdue_percentage': (overdue_count / total_loans * 100) if total_loans else 0.0,
+        'total_fines': round(sum(fines.values()), 2),
+        'pending_fines': round(fines.get('Pending', 0.0), 2),
+        'collected_fines': round(fines.get('Paid', 0.0), 2)
+    }
+
+def run_consortium_analysis(branches, workers=None, top_n=None, memory_budget=DEFAULT_MEMORY_BUDGET,
+                            partitioned=False):
+    """
+    Analyse every branch in its own worker process and reduce the partial
+    results into one consortium-wide report.
+
+    branches maps a branch name to its source (data dict, snapshot directory or
+    SQLite path). To split one large library instead, pass the partition_data
+    parts (e.g. dict(enumerate(parts))) with partitioned=True: member and staff
+    IDs are then shared by every partition and merged by ID.
+    """
+    names = list(branches)
+    keys = [None if partitioned else name for name in names]
+    workers = min(workers or os.cpu_count() or 1, len(names)) or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(analyse_partition, key, branches[name], top_n, memory_budget)
+                       for key, name in zip(keys, names)]
+            partials = [future.result() for future in futures]
+    else:
+        partials = [analyse_partition(key, branches[name], top_n, memory_budget) for key, name in zip(keys, names)]
+    return consortium_report(merge_partials(partials), top_n, partitioned)
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from incremental import FINE_PER_DAY
+from joins import key_positions, take_column
+
+def _as_datetime64(values):
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]')
+
+class OverdueNoticeEngine:
+    """
+    Python-side GenerateOverdueNotices / OverdueLoans view.
+
+    Open loans (ReturnDate IS NULL) are kept as parallel arrays sorted by
+    DueDate, so the loans overdue at any moment are a prefix found with one
+    binary search. Every per-run cost (status flips, DATEDIFF, fine estimates,
+    member/book lookups) is then proportional to the number of overdue loans
+    rather than to the size of the Loans table.
+    """
+
+    def __init__(self, loans, members, books):
+        self.members = members
+        self.books = books
+        self._loan_id = np.empty(0, dtype=np.int64)
+        self._book_id = np.empty(0, dtype=np.int64)
+        self._member_id = np.empty(0, dtype=np.int64)
+        self._checkout = np.empty(0, dtype='datetime64[ns]')
+        self._due = np.empty(0, dtype='datetime64[ns]')
+        self._status = np.empty(0, dtype=object)
+        self.add_loans(loans)
+
+    def __len__(self):
+        return len(self._loan_id)
+
+    def add_loans(self, loans):
+        """
+        Insert new loans; only those without a ReturnDate are tracked
+        """
+        open_loans = loans[loans['ReturnDate'].isna()]
+        if open_loans.empty:
+            return
+        due = _as_datetime64(open_loans['DueDate'])
+        order = np.argsort(due, kind='stable')
+        due = due[order]
+        new = {
+            '_loan_id': open_loans['LoanID'].to_numpy(dtype=np.int64)[order],
+            '_book_id': open_loans['BookID'].to_numpy(dtype=np.int64)[order],
+            '_member_id': open_loans['MemberID'].to_numpy(dtype=np.int64)[order],
+            '_checkout': _as_datetime64(open_loans['CheckoutDate'])[order],
+            '_status': open_loans['Status'].to_numpy(dtype=object)[order]
+        }
+        # Merge the sorted batch into the sorted arrays; ties keep existing loans first
+        at = np.searchsorted(self._due, due, side='right')
+        for name, values in new.items():
+            setattr(self, name, np.insert(getattr(self, name), at, values))
+        self._due = np.insert(self._due, at, due)
+
+    def return_loans(self, loan_ids):
+        """
+        Stop tracking loans that were returned (or otherwise closed)
+        """
+        keep = ~np.isin(self._loan_id, np.asarray(loan_ids, dtype=np.int64))
+        for name in ('_loan_id', '_book_id', '_member_id', '_checkout', '_due', '_status'):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def overdue_count(self, now=None):
+        """
+        Number of open loans with DueDate < now, via one binary search
+        """
+        now = np.datetime64(pd.Timestamp.now() if now is None else pd.Timestamp(now), 'ns')
+        return int(np.searchsorted(self._due, now, side='left'))
+
+    def mark_overdue(self, now=None):
+        """
+        Flip every overdue 'Borrowed' loan to 'Overdue' in bulk, like the UPDATE in
+        GenerateOverdueNotices. Returns the flipped LoanID/Status rows, ready for
+        CirculationAggregates.update_loans or apply_status_updates.
+        """
+        count = self.overdue_count(now)
+        borrowed = np.flatnonzero(self._status[:count] == 'Borrowed')
+        self._status[borrowed] = 'Overdue'
+        return pd.DataFrame({'LoanID': self._loan_id[borrowed], 'Status': 'Overdue'})
+
+    def overdue_loans(self, now=None):
+        """
+        The OverdueLoans view: overdue open loans with days overdue and the
+        estimated fine, computed as array operations over the overdue prefix
+        """
+        now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+        count = self.overdue_count(now)
+        due = self._due[:count]
+        # DATEDIFF(DAY, DueDate, now) counts calendar-day boundaries crossed
+        days = (np.datetime64(now.normalize(), 'D') - due.astype('datetime64[D]')).astype(np.int64)
+        return pd.DataFrame({
+            'LoanID': self._loan_id[:count],
+            'BookID': self._book_id[:count],
+            'MemberID': self._member_id[:count],
+            'CheckoutDate': self._checkout[:count],
+            'DueDate': due,
+            'Status': self._status[:count],
+            'DaysOverdue': days,
+            'EstimatedFine': days * FINE_PER_DAY
+        })
+
+    def notices(self, now=None):
+        """
+        Notice rows of GenerateOverdueNotices, ordered by MemberID and DueDate
+        """
+        overdue = self.overdue_loans(now)
+        members = key_positions(overdue['MemberID'], self.members['MemberID'])
+        books = key_positions(overdue['BookID'], self.books['BookID'])
+        first = pd.Series(take_column(self.members['FirstName'], members), dtype=object)
+        last = pd.Series(take_column(self.members['LastName'], members), dtype=object)
+        notices = pd.DataFrame({
+            'MemberID': overdue['MemberID'],
+            'MemberName': (first + ' ' + last).to_numpy(),
+            'Email': take_column(self.members['Email'], members),
+            'Phone': take_column(self.members['Phone'], members),
+            'Title': take_column(self.books['Title'], books),
+            'CheckoutDate': overdue['CheckoutDate'],
+            'DueDate': overdue['DueDate'],
+            'DaysOverdue': overdue['DaysOverdue'],
+            'EstimatedFine': overdue['EstimatedFine']
+        })
+        return notices.sort_values(['MemberID', 'DueDate'], kind='stable').reset_index(drop=True)
+
+    def notice_batches(self, now=None, members_per_batch=500):
+        """
+        Yield the notices in batches of whole members, each batch a DataFrame
+        holding every overdue loan of at most members_per_batch members
+        """
+        notices = self.notices(now)
+        if notices.empty:
+            return
+        member_ids = notices['MemberID'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, member_ids[1:] != member_ids[:-1]])
+        for first in range(0, len(starts), members_per_batch):
+            start = starts[first]
+            end = starts[first + members_per_batch] if first + members_per_batch < len(starts) else len(notices)
+            yield notices.iloc[start:end]
+
+def apply_status_updates(loans, updates):
+    """
+    Write LoanID/Status updates into a loans frame, returning the updated copy
+    """
+    positions = key_positions(updates['LoanID'], loans['LoanID'])
+    found = positions >= 0
+    loans = loans.copy()
+    status_col = loans.columns.get_loc('Status')
+    loans.iloc[positions[found], status_col] = updates['Status'].to_numpy()[found]
+    return loans
@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+# Default regression thresholds: ratio of current to baseline that fails a run
+DEFAULT_THRESHOLDS = {'wall_seconds': 1.5, 'cpu_seconds': 1.5, 'peak_bytes': 1.5}
+
+# Stages faster than this in both runs are never reported, to ignore timer noise
+MIN_SECONDS = 0.05
+
+class RegressionError(RuntimeError):
+    """
+    Raised when a profiled stage regressed past its threshold
+    """
+
+class StageRecord:
+    """
+    Measurements of one stage; set `rows` inside the stage to record a row count
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.start = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_bytes = None
+
+    def to_dict(self):
+        return {
+            'stage': self.name,
+            'rows': None if self.rows is None else int(self.rows),
+            'start': self.start,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_bytes': self.peak_bytes
+        }
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak traced memory and row counts of named
+    pipeline stages. Stages may nest; each reports the peak memory allocated on
+    top of what was live when it started, an outer stage's peak including the
+    peaks of its inner stages. With enabled=False, stage() only runs the block,
+    so instrumented code costs nothing when not profiled.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = []
+        self._origin = time.perf_counter()
+        # Running absolute traced-memory peak of every open stage, outermost first
+        self._peaks = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = StageRecord(name)
+        if not self.enabled:
+            yield record
+            return
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            # reset_peak() is global: fold the enclosing stage's peak so far first
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            self._peaks.append(baseline)
+        record.start = time.perf_counter() - self._origin
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - self._origin - record.start
+            record.cpu_seconds = time.process_time() - cpu
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                record.peak_bytes = int(peak - baseline)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(record)
+
+    def results(self):
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'stages': [record.to_dict() for record in self.records]
+        }
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.results(), f, indent=2)
+
+    def to_trace(self, path):
+        """
+        Write the stages in the Chrome trace event format (chrome://tracing, Perfetto)
+        """
+        events = [{
+            'name': record.name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+            'ts': record.start * 1e6, 'dur': record.wall_seconds * 1e6,
+            'args': {key: value for key, value in record.to_dict().items() if key not in ('stage', 'start')}
+        } for record in self.records]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+def result_rows(result):
+    """
+    Number of rows in a section result: a frame, a series, or a dict of them
+    """
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(result_rows(value) for value in result.values())
+    return 1
+
+def find_regressions(baseline, current, thresholds=None, min_seconds=MIN_SECONDS):
+    """
+    Stages of current whose metric exceeds its baseline by more than the
+    threshold ratio. Both arguments are StageProfiler.results() dicts.
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    base = {record['stage']: record for record in baseline['stages']}
+    regressions = []
+    for record in current['stages']:
+        previous = base.get(record['stage'])
+        if previous is None:
+            continue
+        for metric, limit in thresholds.items():
+            old, new = previous.get(metric), record.get(metric)
+            if not old or new is None:
+                continue
+            if metric.endswith('seconds') and max(old, new) < min_seconds:
+                continue
+            if new / old > limit:
+                regressions.append({'stage': record['stage'], 'metric': metric, 'baseline': old,
+                                    'current': new, 'ratio': new / old, 'threshold': limit})
+    return regressions
+
+def check_regressions(baseline, current, thresholds=None, min_seconds=MIN_SECONDS):
+    """
+    Raise RegressionError listing every regressed stage, if any
+    """
+    regressions = find_regressions(baseline, current, thresholds, min_seconds)
+    if regressions:
+        lines = [f"{r['stage']} {r['metric']}: {r['current']:.4g} vs {r['baseline']:.4g} (x{r['ratio']:.2f} > x{r['threshold']})"
+                 for r in regressions]
+        raise RegressionError('Stages regressed past their threshold:\n' + '\n'.join(lines))
+
+if __name__ == '__main__':
+    from generate_data import generate_library_data
+    from some_visualization import run_report
+
+    parser = argparse.ArgumentParser(description='Profile every stage of the analysis report')
+    parser.add_argument('--scale', type=float, help='Profile generated data at this scale instead of the sample data')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--charts', default=None, help='Render charts into this directory as part of the run')
+    parser.add_argument('--output', default='profile_results.json', help='Where to write the JSON results')
+    parser.add_argument('--trace', help='Also write a Chrome trace file')
+    parser.add_argument('--baseline', help='Previous results file; fail if a stage regressed')
+    parser.add_argument('--threshold', type=float, help='Regression ratio for every metric')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc, which slows allocation-heavy stages')
+    args = parser.parse_args()
+
+    profiler = StageProfiler(trace_memory=not args.no_memory)
+    data = None
+    if args.scale:
+        with profiler.stage('generate') as stage:
+            data = generate_library_data(scale=args.scale, seed=args.seed)
+            stage.rows = len(data['loans'])
+    # The printed report is part of what is profiled, but not of the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_report(data, chart_dir=args.charts, profiler=profiler)
+    profiler.to_json(args.output)
+    if args.trace:
+        profiler.to_trace(args.trace)
+
+    for record in profiler.records:
+        rows = '' if record.rows is None else record.rows
+        memory = '' if record.peak_bytes is None else f'{record.peak_bytes / 2**20:9.1f} MiB'
+        print(f"{record.name:<16} {rows:>10} rows {record.wall_seconds:8.3f}s wall {record.cpu_seconds:8.3f}s cpu {memory}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        thresholds = {metric: args.threshold for metric in DEFAULT_THRESHOLDS} if args.threshold else None
+        try:
+            check_regressions(baseline, profiler.results(), thresholds)
+        except RegressionError as e:
+            print(e)
+            sys.exit(1)
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+from charts import MONTH_ORDER
+from create_df import TABLE_SCHEMA, available_tables
+from incremental import LOAN_DURATION_LABELS
+from recommender import CoBorrowRecommender
+
+# Date and string expressions that differ between SQL Server and the local SQLite stand-in
+DIALECTS = {
+    'sqlite': {
+        'year': "CAST(strftime('%Y', {col}) AS INTEGER)",
+        'month': "CAST(strftime('%m', {col}) AS INTEGER)",
+        'days': "(strftime('%s', {end}) - strftime('%s', {start})) / 86400",
+        'concat': "{left} || ' ' || {right}"
+    },
+    'mssql': {
+        'year': 'YEAR({col})',
+        'month': 'MONTH({col})',
+        'days': 'DATEDIFF(SECOND, {start}, {end}) / 86400',
+        'concat': "{left} + ' ' + {right}"
+    }
+}
+
+# The indexes of sql/schema/enhancment.sql that the pushed-down aggregates use,
+# for seeding a local SQLite copy (SQL Server already has them)
+REPORT_INDEXES = {
+    'IX_BookCopies_Status': ('BookCopies', ['Status']),
+    'IX_Loans_Status_DueDate': ('Loans', ['Status', 'DueDate']),
+    'IX_BookAuthors_AuthorID': ('BookAuthors', ['AuthorID']),
+    'IX_BookCategories_CategoryID': ('BookCategories', ['CategoryID'])
+}
+
+def _table(name):
+    return TABLE_SCHEMA[name]['table']
+
+def create_report_indexes(conn):
+    """
+    Create REPORT_INDEXES on a SQLite connection if they do not exist yet
+    """
+    for index, (table, columns) in REPORT_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table}({', '.join(columns)})")
+    conn.commit()
+
+class SqlBackend:
+    """
+    Computes every report section as aggregate queries on a DB-API connection,
+    so only the small result sets leave the database. Offers the same methods,
+    returning the same shapes, as some_visualization.PandasBackend.
+    """
+
+    def __init__(self, conn, dialect='sqlite'):
+        if dialect not in DIALECTS:
+            raise ValueError(f"Unknown SQL dialect '{dialect}'. Expected one of: {list(DIALECTS)}")
+        self.conn = conn
+        self.sql = DIALECTS[dialect]
+
+    def query(self, query):
+        return pd.read_sql_query(query, self.conn)
+
+    def overview(self):
+        counts = self.query(' UNION ALL '.join(
+            f"SELECT '{name}' AS Name, COUNT(*) AS Records FROM {_table(name)}" for name in available_tables(self.conn)
+        ))
+        return pd.DataFrame({
+            'Table': [name.replace('_', ' ').title() for name in counts['Name']],
+            'Records': counts['Records']
+        })
+
+    def collection(self):
+        decade = self.sql['year'].format(col='PublicationDate')
+        decades = self.query(
+            f"SELECT Decade, COUNT(*) AS Count FROM "
+            f"(SELECT {decade} / 10 * 10 AS Decade FROM {_table('books')} WHERE PublicationDate IS NOT NULL) d "
+            f"GROUP BY Decade ORDER BY Decade"
+        )
+        author = self.sql['concat'].format(left='a.FirstName', right='a.LastName')
+        return {
+            'decade_counts': pd.Series(decades['Count'].to_numpy(), index=pd.Index(decades['Decade'].to_numpy(), name='PublicationDate'), name='count'),
+            'category_counts': self.query(
+                f"SELECT c.Name AS Category, COUNT(*) AS Count FROM {_table('book_categories')} bc "
+                f"JOIN {_table('categories')} c ON c.CategoryID = bc.CategoryID "
+                f"GROUP BY c.Name ORDER BY Count DESC, Category"
+            ),
+            'author_counts': self.query(
+                f"SELECT {author} AS Author, COUNT(*) AS Count FROM {_table('book_authors')} ba "
+                f"JOIN {_table('authors')} a ON a.AuthorID = ba.AuthorID "
+                f"GROUP BY {author} ORDER BY Count DESC, Author"
+            ),
+            'publisher_counts': self.query(
+                f"SELECT p.Name AS Publisher, COUNT(*) AS Count FROM {_table('books')} b "
+                f"JOIN {_table('publishers')} p ON p.PublisherID = b.PublisherID "
+                f"GROUP BY p.Name ORDER BY Count DESC, Publisher"
+            )
+        }
+
+    def circulation(self):
+        year = self.sql['year'].format(col='CheckoutDate')
+        month = self.sql['month'].format(col='CheckoutDate')
+        loans_by_month = self.query(
+            f"SELECT Year, Month_Num, COUNT(*) AS Count FROM "
+            f"(SELECT {year} AS Year, {month} AS Month_Num FROM {_table('loans')}) l "
+            f"GROUP BY Year, Month_Num ORDER BY Year, Month_Num"
+        )
+        loans_by_month.insert(1, 'Month', [MONTH_ORDER[month - 1] for month in loans_by_month['Month_Num']])
+        loans_by_month = loans_by_month[['Year', 'Month', 'Count', 'Month_Num']]
+
+        borrower_activity = self.query(
+            f"SELECT m.MemberID, m.FirstName, m.LastName, COUNT(*) AS Borrows FROM {_table('loans')} l "
+            f"JOIN {_table('members')} m ON m.MemberID = l.MemberID "
+            f"GROUP BY m.MemberID, m.FirstName, m.LastName ORDER BY Borrows DESC, m.MemberID"
+        )
+        borrower_activity['FullName'] = borrower_activity['FirstName'] + ' ' + borrower_activity['LastName']
+
+        # Durations are binned like pd.cut over LOAN_DURATION_BINS: (0, 7], (7, 14], ... (28, inf)
+        days = self.sql['days'].format(start='CheckoutDate', end='ReturnDate')
+        edges = [0, 7, 14, 21, 28]
+        bins = ', '.join(
+            f"SUM(CASE WHEN d > {low}{f' AND d <= {high}' if high is not None else ''} THEN 1 ELSE 0 END) AS b{i}"
+            for i, (low, high) in enumerate(zip(edges, edges[1:] + [None]))
+        )
+        durations = self.query(
+            f"SELECT AVG(1.0 * d) AS Average, {bins} FROM "
+            f"(SELECT {days} AS d FROM {_table('loans')} WHERE ReturnDate IS NOT NULL) x"
+        ).iloc[0]
+
+        return {
+            'loans_by_month': loans_by_month,
+            'book_popularity': self.query(
+                f"SELECT b.Title, COUNT(*) AS Borrows FROM {_table('loans')} l "
+                f"JOIN {_table('books')} b ON b.BookID = l.BookID "
+                f"GROUP BY b.Title ORDER BY Borrows DESC, b.Title"
+            ),
+            'borrower_activity': borrower_activity,
+            'average_loan_duration': float(durations['Average']) if pd.notna(durations['Average']) else float('nan'),
+            'duration_distribution': pd.Series(
+                [int(durations[f'b{i}'] or 0) for i in range(len(LOAN_DURATION_LABELS))],
+                index=pd.CategoricalIndex(LOAN_DURATION_LABELS, categories=LOAN_DURATION_LABELS, ordered=True, name='LoanDuration'),
+                name='count'
+            )
+        }
+
+    def overdue(self):
+        # The filtered count is a range seek on IX_Loans_Status_DueDate
+        counts = self.query(
+            f"SELECT (SELECT COUNT(*) FROM {_table('loans')} WHERE Status = 'Overdue') AS Overdue, "
+            f"(SELECT COUNT(*) FROM {_table('loans')}) AS Total"
+        ).iloc[0]
+        overdue_count = int(counts['Overdue'])
+        total = int(counts['Total'])
+        return {'overdue_count': overdue_count, 'overdue_percentage': (overdue_count / total) * 100 if total else 0.0}
+
+    def fines(self):
+        totals = self.query(
+            f"SELECT SUM(Amount) AS Total, "
+            f"SUM(CASE WHEN Status = 'Pending' THEN Amount ELSE 0 END) AS Pending, "
+            f"SUM(CASE WHEN Status = 'Paid' THEN Amount ELSE 0 END) AS Paid FROM {_table('fines')}"
+        ).iloc[0]
+        return {
+            'total_fines': float(totals['Total'] or 0.0),
+            'pending_fines': float(totals['Pending'] or 0.0),
+            'collected_fines': float(totals['Paid'] or 0.0)
+        }
+
+    def staff(self):
+        staff_loans = self.query(
+            f"SELECT s.StaffID, COUNT(*) AS ProcessedLoans, s.FirstName, s.LastName FROM {_table('loans')} l "
+            f"JOIN {_table('staff')} s ON s.StaffID = l.StaffID "
+            f"GROUP BY s.StaffID, s.FirstName, s.LastName ORDER BY ProcessedLoans DESC, s.StaffID"
+        )
+        staff_loans['FullName'] = staff_loans['FirstName'] + ' ' + staff_loans['LastName']
+        return staff_loans
+
+    def loan_status(self):
+        return self.query(f"SELECT Status, COUNT(*) AS Count FROM {_table('loans')} GROUP BY Status ORDER BY Count DESC")
+
+    def recommender(self):
+        # Only the distinct member/book pairs are needed, not every loan
+        return CoBorrowRecommender.build(self.query(f"SELECT DISTINCT MemberID, BookID FROM {_table('loans')}"),
+                                         self.query(f"SELECT BookID, CategoryID FROM {_table('book_categories')}"),
+                                         self.query(f"SELECT BookID, AuthorID FROM {_table('book_authors')}"))
+
+    def book_titles(self):
+        return self.query(f"SELECT BookID, Title FROM {_table('books')}")
+
+# Report sections compared by check_parity
+SECTIONS = ['overview', 'collection', 'circulation', 'overdue', 'fines', 'staff', 'loan_status']
+
+def _normalize(value):
+    """
+    Order-independent form of a section result: frames and series sorted by
+    every column (ties may be ordered differently by pandas and the database).
+    Categoricals are compared by value, since they would sort by category order
+    """
+    if isinstance(value, pd.Series):
+        value = value.rename_axis('index').reset_index(name='value')
+        value['index'] = value['index'].astype(str)
+    if isinstance(value, pd.DataFrame):
+        value = value.reset_index(drop=True)
+        categorical = value.select_dtypes('category').columns
+        value[categorical] = value[categorical].astype(object)
+        return value.sort_values(list(value.columns), ignore_index=True)
+    return value
+
+def _compare(name, left, right):
+    left, right = _normalize(left), _normalize(right)
+    if isinstance(left, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(left, right, check_dtype=False, check_categorical=False,
+                                          check_column_type=False, check_index_type=False)
+        except AssertionError as e:
+            return [f"{name}: {e}"]
+        return []
+    if isinstance(left, float) or isinstance(right, float):
+        both_nan = np.isnan(left) and np.isnan(right)
+        return [] if both_nan or np.isclose(left, right) else [f"{name}: {left} != {right}"]
+    return [] if left == right else [f"{name}: {left} != {right}"]
+
+def check_parity(reference, candidate, sections=SECTIONS):
+    """
+    Compare every section of two backends (e.g. PandasBackend and SqlBackend over
+    the same data) and return a list of mismatch descriptions, empty on parity
+    """
+    mismatches = []
+    for section in sections:
+        left, right = getattr(reference, section)(), getattr(candidate, section)()
+        if isinstance(left, dict):
+            for key in left:
+                mismatches += _compare(f'{section}.{key}', left[key], right[key])
+        else:
+            mismatches += _compare(section, left, right)
+    return mismatches
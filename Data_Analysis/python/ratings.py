@@ -0,0 +1,171 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from joins import key_positions
+
+# Star ratings allowed by CHK_BookReviews_Rating
+RATINGS = [1, 2, 3, 4, 5]
+
+# BookRatings view column of each star count
+STAR_COLUMNS = {5: 'FiveStarCount', 4: 'FourStarCount', 3: 'ThreeStarCount', 2: 'TwoStarCount', 1: 'OneStarCount'}
+
+STATE_VERSION = 1
+
+def _approved(reviews):
+    # IsApproved is a nullable BIT: only an explicit 1 counts, as in the view
+    return reviews['IsApproved'].fillna(False).astype(bool).to_numpy()
+
+class RatingAggregates:
+    """
+    Per-book rating histograms of approved reviews, replacing the BookRatings
+    view and its five correlated COUNT(*) subqueries per book.
+
+    Histograms are one (books x 5) integer array filled by a single bincount;
+    review count and mean rating are derived from it. Reviews awaiting
+    moderation are held aside, keyed by ReviewID, and only counted once
+    approve() is called, so unlike the view, star counts respect IsApproved
+    (a NULL IsApproved counts as not approved, like the view's IsApproved = 1).
+    """
+
+    def __init__(self, book_ids=()):
+        self.book_ids = np.asarray(book_ids, dtype=np.int64)
+        self.histogram = np.zeros((len(self.book_ids), len(RATINGS)), dtype=np.int64)
+        # Reviews awaiting moderation as ReviewID -> (BookID, Rating)
+        self._pending = {}
+
+    @classmethod
+    def from_data(cls, data):
+        store = cls(data['books']['BookID'].to_numpy())
+        store.add_reviews(data['book_reviews'])
+        return store
+
+    def _rows(self, book_ids):
+        """
+        Histogram row of every BookID, growing the histogram for unseen books
+        """
+        book_ids = np.asarray(book_ids, dtype=np.int64)
+        new = np.setdiff1d(book_ids, self.book_ids)
+        if len(new):
+            self.book_ids = np.concatenate([self.book_ids, new])
+            self.histogram = np.vstack([self.histogram, np.zeros((len(new), len(RATINGS)), dtype=np.int64)])
+        return key_positions(book_ids, self.book_ids)
+
+    def _count(self, book_ids, ratings, sign=1):
+        ratings = np.asarray(ratings, dtype=np.int64)
+        if len(ratings) and (ratings.min() < RATINGS[0] or ratings.max() > RATINGS[-1]):
+            raise ValueError(f"Ratings must be between {RATINGS[0]} and {RATINGS[-1]}")
+        rows = self._rows(book_ids)
+        cells = np.bincount(rows * len(RATINGS) + ratings - RATINGS[0], minlength=self.histogram.size)
+        self.histogram += sign * cells.reshape(self.histogram.shape)
+
+    def add_reviews(self, reviews):
+        """
+        Add new BookReviews rows: approved ones are counted, the rest wait for approve()
+        """
+        approved = _approved(reviews)
+        self._count(reviews['BookID'].to_numpy()[approved], reviews['Rating'].to_numpy()[approved])
+        waiting = reviews[~approved]
+        self._pending.update(zip(waiting['ReviewID'].to_numpy(dtype=np.int64).tolist(),
+                                 zip(waiting['BookID'].to_numpy(dtype=np.int64).tolist(),
+                                     waiting['Rating'].to_numpy(dtype=np.int64).tolist())))
+
+    def approve(self, review_ids):
+        """
+        Count pending reviews once a moderator approves them; returns how many were approved
+        """
+        approved = [self._pending.pop(review_id) for review_id in np.asarray(review_ids, dtype=np.int64).tolist()
+                    if review_id in self._pending]
+        book_ids, ratings = (list(values) for values in zip(*approved)) if approved else ([], [])
+        self._count(np.asarray(book_ids, dtype=np.int64), ratings)
+        return len(approved)
+
+    def reject(self, review_ids):
+        """
+        Discard pending reviews that were rejected
+        """
+        for review_id in np.asarray(review_ids, dtype=np.int64).tolist():
+            self._pending.pop(review_id, None)
+
+    def remove_reviews(self, reviews):
+        """
+        Take deleted BookReviews rows back out of the counts
+        """
+        approved = _approved(reviews)
+        self._count(reviews['BookID'].to_numpy()[approved], reviews['Rating'].to_numpy()[approved], sign=-1)
+        self.reject(reviews['ReviewID'].to_numpy()[~approved])
+
+    @property
+    def pending(self):
+        """
+        The reviews awaiting moderation as a frame indexed by ReviewID, built on demand
+        """
+        rows = list(self._pending.values())
+        book_ids, ratings = (list(values) for values in zip(*rows)) if rows else ([], [])
+        return pd.DataFrame({'BookID': np.asarray(book_ids, dtype=np.int64), 'Rating': np.asarray(ratings, dtype=np.int64)},
+                            index=pd.Index(list(self._pending), dtype='int64', name='ReviewID'))
+
+    def book_ratings(self, books):
+        """
+        The BookRatings view: one row per book with ReviewCount, AverageRating
+        (NaN without reviews) and the approved five- to one-star counts
+        """
+        rows = key_positions(books['BookID'], self.book_ids)
+        histogram = np.zeros((len(books), len(RATINGS)), dtype=np.int64)
+        histogram[rows >= 0] = self.histogram[rows[rows >= 0]]
+        counts = histogram.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average = histogram @ np.asarray(RATINGS, dtype=np.float64) / counts
+        ratings = pd.DataFrame({
+            'BookID': books['BookID'].to_numpy(),
+            'Title': books['Title'].to_numpy(),
+            'ReviewCount': counts,
+            'AverageRating': average
+        })
+        for rating, column in STAR_COLUMNS.items():
+            ratings[column] = histogram[:, rating - RATINGS[0]]
+        return ratings
+
+    def top_rated(self, books, n=10, min_reviews=5):
+        """
+        Highest average rating among books with at least min_reviews approved reviews
+        """
+        ratings = self.book_ratings(books)
+        ratings = ratings[ratings['ReviewCount'] >= min_reviews]
+        return ratings.sort_values(['AverageRating', 'ReviewCount'], ascending=False).head(n)
+
+    def save(self, path):
+        """
+        Persist the histograms and pending reviews as JSON, replacing path atomically
+        """
+        state = {
+            'version': STATE_VERSION,
+            'book_ids': self.book_ids.tolist(),
+            'histogram': self.histogram.tolist(),
+            'pending': {
+                'ReviewID': list(self._pending),
+                'BookID': [book_id for book_id, _ in self._pending.values()],
+                'Rating': [rating for _, rating in self._pending.values()]
+            }
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore a store saved with save()
+        """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported rating state version {state.get('version')} in {path}")
+        store = cls(state['book_ids'])
+        store.histogram = np.asarray(state['histogram'], dtype=np.int64).reshape(len(store.book_ids), len(RATINGS))
+        pending = state['pending']
+        store._pending = dict(zip(pending['ReviewID'], zip(pending['BookID'], pending['Rating'])))
+        return store
@@ -0,0 +1,203 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from joins import lookup
+
+# Neighbours kept per book
+DEFAULT_NEIGHBOURS = 50
+
+# Cap on the (book, co-borrowed book) pairs materialized at once while building
+DEFAULT_MAX_PAIRS = 5_000_000
+
+# Members with more distinct books than this are left out of the co-borrow
+# counts: they link almost everything to everything and dominate the cost
+DEFAULT_MAX_MEMBER_BOOKS = 1000
+
+# Similarity multipliers for book pairs sharing a category / an author
+CATEGORY_BOOST = 0.25
+AUTHOR_BOOST = 0.5
+
+def _csr(rows, cols, n_rows):
+    """
+    Compressed rows of the unique (row, col) pairs: indptr and sorted col indices
+    """
+    width = int(cols.max()) + 1 if len(cols) else 1
+    pairs = np.unique(rows.astype(np.int64) * width + cols)
+    rows, cols = pairs // width, pairs % width
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols
+
+def _expand(indptr, indices, rows):
+    """
+    For each entry of rows, all of that row's indices; also returns which
+    entry of rows each output belongs to
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[starts[owner] + offsets], owner
+
+def _shared(indptr, indices, left, right):
+    """
+    Whether each (left, right) book pair shares at least one linked category/author
+    """
+    width = int(indices.max()) + 1 if len(indices) else 1
+    links = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)) * width + indices
+    values, owner = _expand(indptr, indices, right)
+    keys = left[owner] * width + values
+    found = np.searchsorted(links, keys)
+    hit = (found < len(links)) & (links[np.minimum(found, len(links) - 1)] == keys)
+    return np.bincount(owner[hit], minlength=len(left)) > 0
+
+class CoBorrowRecommender:
+    """
+    Item-to-item recommender from co-borrowing.
+
+    Books are similar when the same members borrowed both (cosine of their
+    member sets), boosted when they share a category or an author. Each book
+    keeps its top `neighbours` similar books; a member is recommended the
+    unseen books with the highest summed similarity to what they borrowed.
+    """
+
+    def __init__(self, book_ids, member_ids, member_indptr, member_books, neighbour_index, neighbour_scores):
+        self.book_ids = book_ids
+        self.member_ids = member_ids
+        self.member_indptr = member_indptr
+        self.member_books = member_books
+        self.neighbour_index = neighbour_index
+        self.neighbour_scores = neighbour_scores
+
+    @classmethod
+    def build(cls, loans, book_categories, book_authors, neighbours=DEFAULT_NEIGHBOURS,
+              max_pairs=DEFAULT_MAX_PAIRS, max_member_books=DEFAULT_MAX_MEMBER_BOOKS):
+        """
+        Build the member x book matrix and every book's top neighbours.
+
+        Co-borrow counts are computed for blocks of books at a time, each block
+        sized so that at most max_pairs candidate pairs exist at once; memory is
+        bounded by that and by the neighbour table, not by loan volume.
+        """
+        book_ids = np.unique(np.concatenate([loans['BookID'].to_numpy(dtype=np.int64),
+                                             book_categories['BookID'].to_numpy(dtype=np.int64),
+                                             book_authors['BookID'].to_numpy(dtype=np.int64)]))
+        member_ids, member_pos = np.unique(loans['MemberID'].to_numpy(dtype=np.int64), return_inverse=True)
+        book_pos = np.searchsorted(book_ids, loans['BookID'].to_numpy(dtype=np.int64))
+        n_books, n_members = len(book_ids), len(member_ids)
+
+        # Sparse member x book matrix, in rows (per member) and columns (per book)
+        member_indptr, member_books = _csr(member_pos, book_pos, n_members)
+        basket = np.diff(member_indptr)
+        counted = np.repeat(basket <= max_member_books, basket)
+        member_rows = np.repeat(np.arange(n_members), basket)
+        book_indptr, book_members = _csr(member_books[counted], member_rows[counted], n_books)
+        popularity = np.diff(book_indptr).astype(np.float64)
+
+        category_indptr, categories = _csr(np.searchsorted(book_ids, book_categories['BookID'].to_numpy(dtype=np.int64)),
+                                           book_categories['CategoryID'].to_numpy(dtype=np.int64), n_books)
+        author_indptr, authors = _csr(np.searchsorted(book_ids, book_authors['BookID'].to_numpy(dtype=np.int64)),
+                                      book_authors['AuthorID'].to_numpy(dtype=np.int64), n_books)
+
+        neighbour_index = np.full((n_books, neighbours), -1, dtype=np.int64)
+        neighbour_scores = np.zeros((n_books, neighbours), dtype=np.float32)
+        counted_basket = np.where(basket <= max_member_books, basket, 0)
+        # Candidate pairs each book generates: the baskets of everyone who borrowed it
+        work = np.bincount(np.repeat(np.arange(n_books), np.diff(book_indptr)),
+                           weights=counted_basket[book_members], minlength=n_books)
+        cumulative = np.concatenate([[0.0], np.cumsum(work)])
+        start = 0
+        while start < n_books:
+            end = max(start + 1, int(np.searchsorted(cumulative, cumulative[start] + max_pairs, side='right')) - 1)
+            end = min(end, n_books)
+            cls._block_neighbours(start, end, book_indptr, book_members, member_indptr, member_books,
+                                  popularity, (category_indptr, categories), (author_indptr, authors),
+                                  neighbour_index, neighbour_scores)
+            start = end
+        return cls(book_ids, member_ids, member_indptr, member_books, neighbour_index, neighbour_scores)
+
+    @staticmethod
+    def _block_neighbours(start, end, book_indptr, book_members, member_indptr, member_books,
+                          popularity, category_links, author_links, neighbour_index, neighbour_scores):
+        """
+        Fill the neighbour rows of books [start, end)
+        """
+        n_books = len(popularity)
+        block = np.arange(start, end)
+        members, owner = _expand(book_indptr, book_members, block)
+        others, via = _expand(member_indptr, member_books, members)
+        left = block[owner[via]]
+        pairs, co_borrows = np.unique(left * n_books + others, return_counts=True)
+        left, right = pairs // n_books, pairs % n_books
+        keep = left != right
+        left, right, co_borrows = left[keep], right[keep], co_borrows[keep]
+        if not len(left):
+            return
+
+        score = co_borrows / np.sqrt(popularity[left] * popularity[right])
+        score *= 1 + CATEGORY_BOOST * _shared(*category_links, left, right) + AUTHOR_BOOST * _shared(*author_links, left, right)
+
+        # Top neighbours per book: sort by book then descending score, keep the first k of each
+        order = np.lexsort((-score, left))
+        left, right, score = left[order], right[order], score[order]
+        first = np.searchsorted(left, left, side='left')
+        rank = np.arange(len(left)) - first
+        top = rank < neighbour_index.shape[1]
+        neighbour_index[left[top], rank[top]] = right[top]
+        neighbour_scores[left[top], rank[top]] = score[top]
+
+    def recommend(self, member_id, n=10, books=None):
+        """
+        Top n books the member has not borrowed, with their scores (and titles
+        when a books frame is given)
+        """
+        position = np.searchsorted(self.member_ids, member_id)
+        if position < len(self.member_ids) and self.member_ids[position] == member_id:
+            seen = self.member_books[self.member_indptr[position]:self.member_indptr[position + 1]]
+        else:
+            seen = np.empty(0, dtype=np.int64)
+        candidates = self.neighbour_index[seen].ravel()
+        weights = self.neighbour_scores[seen].ravel()
+        valid = candidates >= 0
+        scores = np.bincount(candidates[valid], weights=weights[valid], minlength=len(self.book_ids))
+        scores[seen] = 0
+        ranked = np.argsort(-scores, kind='stable')[:n]
+        ranked = ranked[scores[ranked] > 0]
+        result = pd.DataFrame({'BookID': self.book_ids[ranked], 'Score': scores[ranked]})
+        if books is not None:
+            result.insert(1, 'Title', lookup(books, 'BookID', 'Title', result['BookID']))
+        return result
+
+    def similar_books(self, book_id, n=10):
+        """
+        A book's stored neighbours, most similar first
+        """
+        position = np.searchsorted(self.book_ids, book_id)
+        if position >= len(self.book_ids) or self.book_ids[position] != book_id:
+            raise KeyError(f"Unknown BookID {book_id}")
+        index = self.neighbour_index[position][:n]
+        valid = index >= 0
+        return pd.DataFrame({'BookID': self.book_ids[index[valid]], 'Score': self.neighbour_scores[position][:n][valid]})
+
+    def save(self, path):
+        """
+        Persist the neighbour table and member histories as one .npz file,
+        replacing path atomically
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, book_ids=self.book_ids, member_ids=self.member_ids, member_indptr=self.member_indptr,
+                     member_books=self.member_books, neighbour_index=self.neighbour_index,
+                     neighbour_scores=self.neighbour_scores)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Restore a recommender saved with save()
+        """
+        with np.load(path) as arrays:
+            return cls(arrays['book_ids'], arrays['member_ids'], arrays['member_indptr'], arrays['member_books'],
+                       arrays['neighbour_index'], arrays['neighbour_scores'])
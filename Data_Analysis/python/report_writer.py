@@ -0,0 +1,174 @@
+import html
+import json
+import sys
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+# Output formats of make_writer
+FORMATS = ['markdown', 'html', 'json']
+
+def as_text(values):
+    """
+    Values as a string Series, nulls rendered as 'nan' like an f-string would
+    """
+    return pd.Series(values).reset_index(drop=True).astype(str).fillna('nan')
+
+class ReportWriter(ABC):
+    """
+    Writes report blocks (headings, text, bullet lists, tables) to a stream or
+    file as they are produced, instead of printing them line by line.
+
+    Bullet lists arrive as whole string Series built with vectorized string
+    operations and are written with one call each. With top_n, lists are cut
+    to their first top_n items (see limit()) and note how many were left out.
+    Subclasses decide the output format by implementing heading(), text(),
+    bullets() and table(); blank() only affects plain text.
+    """
+
+    def __init__(self, out=None, top_n=None):
+        self.top_n = top_n
+        self._owns_stream = isinstance(out, str)
+        self.stream = open(out, 'w', encoding='utf-8') if self._owns_stream else (out or sys.stdout)
+        self.begin()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def limit(self, frame):
+        """
+        The rows of a frame or series to render and how many were omitted
+        """
+        if self.top_n is None or len(frame) <= self.top_n:
+            return frame, 0
+        return frame.head(self.top_n), len(frame) - self.top_n
+
+    def write(self, text):
+        self.stream.write(text)
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    def close(self):
+        self.end()
+        if self._owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    @abstractmethod
+    def heading(self, text, level=2):
+        pass
+
+    @abstractmethod
+    def text(self, line):
+        pass
+
+    @abstractmethod
+    def bullets(self, items, omitted=0, indent=0):
+        pass
+
+    @abstractmethod
+    def table(self, frame):
+        pass
+
+    def blank(self, lines=1):
+        pass
+
+class MarkdownWriter(ReportWriter):
+    """
+    Plain Markdown, byte for byte what the report used to print
+    """
+
+    def heading(self, text, level=2):
+        self.write(f"{'#' * level} {text}\n")
+
+    def text(self, line):
+        self.write(f"{line}\n")
+
+    def bullets(self, items, omitted=0, indent=0):
+        prefix = '  ' * indent + '- '
+        lines = (prefix + as_text(items)).tolist()
+        if omitted:
+            lines.append(f"{prefix}... and {omitted} more")
+        if lines:
+            self.write('\n'.join(lines) + '\n')
+
+    def table(self, frame):
+        self.write(frame.to_string(index=False) + '\n')
+
+    def blank(self, lines=1):
+        self.write('\n' * lines)
+
+class HtmlWriter(ReportWriter):
+    """
+    A standalone HTML document
+    """
+
+    def begin(self):
+        self.write('<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>Library Report</title></head>\n<body>\n')
+
+    def end(self):
+        self.write('</body>\n</html>\n')
+
+    def heading(self, text, level=2):
+        self.write(f"<h{level}>{html.escape(str(text))}</h{level}>\n")
+
+    def text(self, line):
+        self.write(f"<p>{html.escape(str(line))}</p>\n")
+
+    def bullets(self, items, omitted=0, indent=0):
+        items = as_text(items).map(html.escape)
+        lines = ('<li>' + items + '</li>').tolist()
+        if omitted:
+            lines.append(f"<li><em>... and {omitted} more</em></li>")
+        self.write('<ul>\n' + '\n'.join(lines) + '\n</ul>\n')
+
+    def table(self, frame):
+        self.write(frame.to_html(index=False) + '\n')
+
+class JsonWriter(ReportWriter):
+    """
+    A JSON array of blocks, streamed one block at a time
+    """
+
+    def begin(self):
+        self._first = True
+        self.write('[')
+
+    def end(self):
+        self.write('\n]\n')
+
+    def _block(self, block):
+        self.write(('\n' if self._first else ',\n') + json.dumps(block, default=str))
+        self._first = False
+
+    def heading(self, text, level=2):
+        self._block({'type': 'heading', 'level': level, 'text': str(text)})
+
+    def text(self, line):
+        self._block({'type': 'text', 'text': str(line)})
+
+    def bullets(self, items, omitted=0, indent=0):
+        self._block({'type': 'list', 'indent': indent, 'items': as_text(items).tolist(), 'omitted': omitted})
+
+    def table(self, frame):
+        self._block({'type': 'table', 'columns': [str(col) for col in frame.columns],
+                     'rows': frame.astype(object).where(frame.notna(), None).values.tolist()})
+
+WRITERS = {'markdown': MarkdownWriter, 'html': HtmlWriter, 'json': JsonWriter}
+
+def make_writer(fmt='markdown', out=None, top_n=None):
+    """
+    A report writer for one of FORMATS, writing to out (a path or a stream,
+    default stdout)
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format '{fmt}'. Expected one of: {FORMATS}")
+    return WRITERS[fmt](out, top_n)
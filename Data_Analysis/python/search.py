@@ -0,0 +1,429 @@
+import bisect
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from joins import author_names, bridge_labels, lookup
+
+# Term frequencies are multiplied by the weight of the field a term came from
+FIELD_WEIGHTS = {
+    'Title': 3,
+    'Author': 2,
+    'Category': 2,
+    'Publisher': 1,
+    'Description': 1,
+    'Biography': 1,
+    'CategoryDescription': 1
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Separator of the string lists packed into the saved index
+_SEP = '\x1f'
+
+# Terms changed since the postings were last compiled into flat arrays that a
+# query tolerates before they are recompiled (or a tenth of the vocabulary)
+RECOMPILE_TERMS = 1000
+
+def tokenize(text):
+    """
+    Lowercased word tokens of a text; nulls have none
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+ISBN10_PATTERN = re.compile(r'\d{9}[\dX]')
+
+def normalize_isbn(isbn):
+    """
+    Canonical ISBN-13 form of an ISBN: hyphens and spaces dropped, and an
+    ISBN-10 converted to its 978-prefixed ISBN-13
+    """
+    isbn = re.sub(r'[\s-]', '', str(isbn)).upper()
+    if ISBN10_PATTERN.fullmatch(isbn):
+        digits = '978' + isbn[:9]
+        check = -sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits)) % 10
+        isbn = digits + str(check)
+    return isbn
+
+def _pack_strings(values):
+    return np.frombuffer(_SEP.join(values).encode('utf-8'), dtype=np.uint8)
+
+def _unpack_strings(array, count):
+    # count disambiguates no strings from a single empty string
+    return array.tobytes().decode('utf-8').split(_SEP) if count else []
+
+def book_fields(data, book_ids=None):
+    """
+    The searchable text of each book, one column per FIELD_WEIGHTS field, with
+    author, category and publisher text resolved through the bridges
+    """
+    books = data['books']
+    if book_ids is not None:
+        books = books[books['BookID'].isin(book_ids)]
+    ids = books['BookID']
+    fields = pd.DataFrame({'BookID': ids.to_numpy(), 'ISBN': books['ISBN'].to_numpy(),
+                           'Title': books['Title'].to_numpy(), 'Description': books['Description'].to_numpy()})
+    labels = {
+        'Author': (data['book_authors'], data['authors'], 'AuthorID', author_names(data['authors'])),
+        'Biography': (data['book_authors'], data['authors'], 'AuthorID', data['authors']['Biography']),
+        'Category': (data['book_categories'], data['categories'], 'CategoryID', data['categories']['Name']),
+        'CategoryDescription': (data['book_categories'], data['categories'], 'CategoryID', data['categories']['Description'])
+    }
+    for field, (bridge, dimension, key, values) in labels.items():
+        joined = bridge_labels(bridge, dimension, key, values, sep=' ')
+        fields[field] = lookup(joined.rename(field).reset_index(), 'BookID', field, ids)
+    fields['Publisher'] = lookup(data['publishers'], 'PublisherID', 'Name', books['PublisherID'])
+    return fields
+
+class CatalogIndex:
+    """
+    In-process inverted index over the catalog with BM25 ranking.
+
+    Each book is one document built from its title, description, authors (names
+    and biographies), categories (names and descriptions) and publisher. The
+    last query word also matches as a prefix, for search-as-you-type. Books can
+    be added, replaced and removed one at a time, and the whole index saves to
+    a single .npz file.
+
+    Postings are compiled into flat arrays ordered by term, so the terms a
+    query (or a prefix) matches are one contiguous slice that is scored with
+    numpy. Terms touched by later updates move to per-term dicts until enough
+    of them accumulate to recompile; queries mask their stale compiled postings
+    and score the dicts alongside. Only the top n results are sorted.
+    """
+
+    def __init__(self):
+        # term -> its index in the compiled arrays, or a BookID -> tf dict once changed
+        self._postings = {}
+        self._changed = set()
+        self._doc_terms = {}
+        self._lengths = {}
+        self._titles = {}
+        self._isbns = {}
+        self._doc_isbns = {}
+        self._total_length = 0
+        self._vocabulary = None
+        self._packed = None
+        # Book slots: BookID -> position in the slot arrays, reused once freed
+        self._slots = {}
+        self._free_slots = []
+        self._slot_ids = np.zeros(0, dtype=np.int64)
+        self._slot_lengths = np.zeros(0, dtype=np.float64)
+        # Changed terms' postings as (slots, tfs) arrays, built when first queried
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self._lengths)
+
+    @classmethod
+    def from_data(cls, data):
+        index = cls()
+        index.add_books(data)
+        index._compile()
+        return index
+
+    def add_books(self, data, book_ids=None):
+        """
+        Index (or re-index) the books of a data dict, optionally only book_ids
+        """
+        for row in book_fields(data, book_ids).itertuples(index=False):
+            row = row._asdict()
+            self.add_document(row['BookID'], {field: row[field] for field in FIELD_WEIGHTS},
+                              isbn=row['ISBN'], title=row['Title'])
+
+    def add_document(self, book_id, fields, isbn=None, title=None):
+        """
+        Index one book from a field name -> text mapping, replacing any earlier version
+        """
+        book_id = int(book_id)
+        if book_id in self._lengths:
+            self.remove(book_id)
+        counts = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1)
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + weight
+        for term, tf in counts.items():
+            postings = self._term_postings(term)
+            if not postings:
+                self._vocabulary = None
+            postings[book_id] = tf
+            self._postings[term] = postings
+            self._changed.add(term)
+            self._arrays.pop(term, None)
+        self._doc_terms[book_id] = list(counts)
+        length = sum(counts.values())
+        self._lengths[book_id] = length
+        self._add_slot(book_id, length)
+        self._total_length += length
+        self._titles[book_id] = title
+        if isbn is not None and not pd.isna(isbn):
+            isbn = normalize_isbn(isbn)
+            self._isbns[isbn] = book_id
+            self._doc_isbns.setdefault(book_id, []).append(isbn)
+
+    def remove(self, book_id):
+        """
+        Drop one book from the index
+        """
+        book_id = int(book_id)
+        if book_id not in self._lengths:
+            raise KeyError(f"BookID {book_id} is not indexed")
+        for term in self._terms_of(book_id):
+            postings = self._term_postings(term)
+            postings.pop(book_id, None)
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                self._changed.discard(term)
+                self._vocabulary = None
+        del self._doc_terms[book_id]
+        self._total_length -= self._lengths.pop(book_id)
+        slot = self._slots.pop(book_id)
+        self._slot_ids[slot] = -1
+        self._slot_lengths[slot] = 0
+        self._free_slots.append(slot)
+        self._titles.pop(book_id, None)
+        for isbn in self._doc_isbns.pop(book_id, []):
+            if self._isbns.get(isbn) == book_id:
+                del self._isbns[isbn]
+
+    def _add_slot(self, book_id, length):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slots)
+            if slot == len(self._slot_ids):
+                capacity = max(16, 2 * slot)
+                self._slot_ids = np.concatenate([self._slot_ids, np.full(capacity - slot, -1, dtype=np.int64)])
+                self._slot_lengths = np.concatenate([self._slot_lengths, np.zeros(capacity - slot)])
+        self._slots[book_id] = slot
+        self._slot_ids[slot] = book_id
+        self._slot_lengths[slot] = length
+
+    def _slot_count(self):
+        return len(self._slots) + len(self._free_slots)
+
+    def _term_postings(self, term):
+        """
+        BookID -> weighted term frequency of a term, moving it out of the
+        compiled arrays on first use
+        """
+        postings = self._postings.get(term)
+        if postings is None:
+            return {}
+        if isinstance(postings, int):
+            ptr, slots, tfs = self._packed['term_ptr'], self._packed['post_slots'], self._packed['post_tfs']
+            start, end = ptr[postings], ptr[postings + 1]
+            self._packed['stale'][postings] = True
+            postings = dict(zip(self._slot_ids[slots[start:end]].tolist(), tfs[start:end].astype(np.int64).tolist()))
+            self._postings[term] = postings
+            self._changed.add(term)
+        return postings
+
+    def _term_arrays(self, term):
+        """
+        Slots and weighted term frequencies of a changed term's postings
+        """
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(map(self._slots.__getitem__, postings), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            )
+        return arrays
+
+    def _terms_of(self, book_id):
+        terms = self._doc_terms[book_id]
+        if isinstance(terms, int):
+            ptr, term_ids = self._packed['doc_ptr'], self._packed['doc_terms']
+            terms = [self._packed['terms'][i] for i in term_ids[ptr[terms]:ptr[terms + 1]].tolist()]
+            self._doc_terms[book_id] = terms
+        return terms
+
+    def _compile(self):
+        """
+        Fold every term into flat arrays ordered by term: term_ptr delimits each
+        term's (post_slots, post_tfs), and doc_ptr/doc_terms list each slot's terms
+        """
+        terms = sorted(self._postings)
+        slots, tfs = [], []
+        for term in terms:
+            postings = self._postings[term]
+            if isinstance(postings, int):
+                start, end = self._packed['term_ptr'][postings], self._packed['term_ptr'][postings + 1]
+                slots.append(self._packed['post_slots'][start:end])
+                tfs.append(self._packed['post_tfs'][start:end])
+            else:
+                slots.append(np.fromiter(map(self._slots.__getitem__, postings), dtype=np.int64, count=len(postings)))
+                tfs.append(np.fromiter(postings.values(), dtype=np.float64, count=len(postings)))
+        sizes = np.fromiter(map(len, slots), dtype=np.int64, count=len(terms))
+        post_slots = np.concatenate(slots) if terms else np.zeros(0, dtype=np.int64)
+        order = np.argsort(post_slots, kind='stable')
+        self._packed = {
+            'terms': terms,
+            'term_ptr': np.concatenate([[0], np.cumsum(sizes)]),
+            'post_slots': post_slots,
+            'post_tfs': np.concatenate(tfs) if terms else np.zeros(0),
+            'stale': np.zeros(len(terms), dtype=bool),
+            'doc_ptr': np.concatenate([[0], np.cumsum(np.bincount(post_slots, minlength=self._slot_count()))]),
+            'doc_terms': np.repeat(np.arange(len(terms)), sizes)[order]
+        }
+        self._postings = {term: i for i, term in enumerate(terms)}
+        self._vocabulary = terms
+        self._doc_terms = dict(self._slots)
+        self._changed = set()
+        self._arrays = {}
+
+    def expand(self, prefix):
+        """
+        Every indexed term starting with prefix
+        """
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff')
+        return self._vocabulary[start:end]
+
+    def lookup_isbn(self, isbn):
+        """
+        BookID of an exact ISBN (hyphens and spaces ignored), or None
+        """
+        return self._isbns.get(normalize_isbn(isbn))
+
+    def _matches(self, token, prefix):
+        """
+        Postings of the terms equal to (or starting with) a token, as lists of
+        slot, tf and document-frequency arrays
+        """
+        slots, tfs, sizes = [], [], []
+        if self._packed is not None:
+            # Matching compiled terms are one contiguous slice; changed terms are masked out
+            terms = self._packed['terms']
+            start = bisect.bisect_left(terms, token)
+            end = bisect.bisect_left(terms, token + '\U0010ffff') if prefix else start + (terms[start:start + 1] == [token])
+            ptr = self._packed['term_ptr']
+            counts = np.diff(ptr[start:end + 1])
+            keep = np.repeat(~self._packed['stale'][start:end], counts)
+            slots.append(self._packed['post_slots'][ptr[start]:ptr[end]][keep])
+            tfs.append(self._packed['post_tfs'][ptr[start]:ptr[end]][keep])
+            sizes.append(np.repeat(counts, counts)[keep])
+        changed = [term for term in self._changed if term.startswith(token)] if prefix else \
+            ([token] if token in self._changed else [])
+        for term in changed:
+            term_slots, term_tfs = self._term_arrays(term)
+            slots.append(term_slots)
+            tfs.append(term_tfs)
+            sizes.append(np.full(len(term_tfs), len(term_tfs)))
+        return slots, tfs, sizes
+
+    def search(self, query, n=10, prefix=True):
+        """
+        Top n books for a query as BookID, Title and Score. A query that is an
+        indexed ISBN returns just that book.
+        """
+        book_id = self.lookup_isbn(query)
+        if book_id is not None:
+            return pd.DataFrame({'BookID': [book_id], 'Title': [self._titles.get(book_id)], 'Score': [float('inf')]})
+        if len(self._changed) > max(RECOMPILE_TERMS, len(self._postings) // 10):
+            self._compile()
+        tokens = tokenize(query)
+        docs = len(self._lengths)
+        slots, tfs, sizes = [], [], []
+        if docs:
+            for position, token in enumerate(tokens):
+                matched = self._matches(token, prefix and position == len(tokens) - 1)
+                slots += matched[0]
+                tfs += matched[1]
+                sizes += matched[2]
+        scores = np.zeros(0)
+        if slots:
+            slots, tfs, sizes = np.concatenate(slots), np.concatenate(tfs), np.concatenate(sizes)
+            idf = np.log1p((docs - sizes + 0.5) / (sizes + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._slot_lengths[slots] / (self._total_length / docs))
+            scores = np.bincount(slots, weights=idf * tfs * (BM25_K1 + 1) / (tfs + norm), minlength=self._slot_count())
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n > 0:
+            # Keep every candidate tied with the n-th best so BookID breaks ties exactly
+            threshold = -np.partition(-scores[candidates], n - 1)[n - 1]
+            candidates = candidates[scores[candidates] >= threshold]
+        ranked = candidates[np.lexsort((self._slot_ids[candidates], -scores[candidates]))][:max(n, 0)]
+        return pd.DataFrame({
+            'BookID': self._slot_ids[ranked],
+            'Title': [self._titles.get(doc) for doc in self._slot_ids[ranked].tolist()],
+            'Score': scores[ranked]
+        })
+
+    def save(self, path):
+        """
+        Persist the index as one .npz file of flat arrays, replacing path atomically
+        """
+        self._compile()
+        packed = self._packed
+        # Documents are stored in BookID order rather than slot order
+        live = np.flatnonzero(self._slot_ids[:self._slot_count()] >= 0)
+        live = live[np.argsort(self._slot_ids[live])]
+        doc_ptr = packed['doc_ptr']
+        counts = doc_ptr[live + 1] - doc_ptr[live]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        doc_terms = packed['doc_terms'][np.repeat(doc_ptr[live] - offsets[:-1], counts) + np.arange(offsets[-1])]
+        doc_ids = self._slot_ids[live]
+        isbns = list(self._isbns)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f,
+                     terms=_pack_strings(packed['terms']),
+                     term_ptr=packed['term_ptr'].astype(np.int64),
+                     post_docs=self._slot_ids[packed['post_slots']],
+                     post_tfs=packed['post_tfs'].astype(np.int32),
+                     doc_ids=doc_ids,
+                     doc_lengths=self._slot_lengths[live].astype(np.int64),
+                     doc_ptr=offsets.astype(np.int64),
+                     doc_terms=doc_terms.astype(np.int32),
+                     titles=_pack_strings(['' if self._titles.get(doc) is None else str(self._titles[doc]) for doc in doc_ids.tolist()]),
+                     isbns=_pack_strings(isbns),
+                     isbn_docs=np.asarray([self._isbns[isbn] for isbn in isbns], dtype=np.int64))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open an index saved with save(); documents take their saved positions as
+        slots and the postings stay in their saved flat arrays
+        """
+        index = cls()
+        with np.load(path) as arrays:
+            packed = {name: arrays[name] for name in arrays.files}
+        doc_ids = packed['doc_ids'].tolist()
+        terms = _unpack_strings(packed['terms'], len(packed['term_ptr']) - 1)
+        index._packed = {
+            'terms': terms,
+            'term_ptr': packed['term_ptr'],
+            'post_slots': np.searchsorted(packed['doc_ids'], packed['post_docs']),
+            'post_tfs': packed['post_tfs'].astype(np.float64),
+            'stale': np.zeros(len(terms), dtype=bool),
+            'doc_ptr': packed['doc_ptr'],
+            'doc_terms': packed['doc_terms']
+        }
+        index._postings = {term: i for i, term in enumerate(terms)}
+        index._vocabulary = terms
+        index._doc_terms = {doc: i for i, doc in enumerate(doc_ids)}
+        index._lengths = dict(zip(doc_ids, packed['doc_lengths'].tolist()))
+        index._total_length = int(packed['doc_lengths'].sum())
+        index._slots = {doc: i for i, doc in enumerate(doc_ids)}
+        index._slot_ids = packed['doc_ids'].copy()
+        index._slot_lengths = packed['doc_lengths'].astype(np.float64)
+        index._titles = dict(zip(doc_ids, _unpack_strings(packed['titles'], len(doc_ids))))
+        index._isbns = dict(zip(_unpack_strings(packed['isbns'], len(packed['isbn_docs'])), packed['isbn_docs'].tolist()))
+        for isbn, doc in index._isbns.items():
+            index._doc_isbns.setdefault(doc, []).append(isbn)
+        return index
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# On-disk layout of a snapshot directory:
+#
+#   manifest.json              table -> directory, fingerprint, row count and column specs
+#   <dir>/<column>.npy         fixed-width values (ints, floats, bools, datetimes)
+#                              or the integer codes of a categorical column
+#   <dir>/<column>.mask.npy    null mask for nullable and string columns
+#   <dir>/<column>.offsets.npy, <dir>/<column>.bytes.npy
+#                              UTF-8 string columns stored Arrow-style as one
+#                              byte buffer plus int64 offsets
+#
+# <dir> is '<table>.<generation>'. A rewritten table goes into a new generation
+# directory and only becomes visible when manifest.json is atomically replaced,
+# so a crash mid-save leaves the previous snapshot intact.
+#
+# Fixed-width columns are opened with np.load(mmap_mode='r') so loading them is
+# zero-copy; only projected columns are ever touched.
+
+MANIFEST = 'manifest.json'
+SNAPSHOT_FORMAT = 1
+
+def table_fingerprint(df):
+    """
+    Content fingerprint of a table: its column names, dtypes and row hashes
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([[col, str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _write_array(path, array):
+    """
+    Write an array next to its final name and move it into place atomically
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+def _write_column(table_dir, col, series):
+    """
+    Persist one column and return its manifest entry
+    """
+    base = os.path.join(table_dir, col)
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Categoricals: integer codes (-1 for null) plus the categories in the manifest
+        _write_array(base + '.npy', series.cat.codes.to_numpy())
+        return {'kind': 'category', 'dtype': 'category', 'categories': series.cat.categories.tolist(),
+                'ordered': bool(dtype.ordered)}
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and hasattr(series.array, '_data') and hasattr(series.array, '_mask'):
+        # Nullable Int64/Float64/boolean: values plus null mask
+        _write_array(base + '.npy', series.array._data)
+        _write_array(base + '.mask.npy', series.array._mask)
+        return {'kind': 'masked', 'dtype': str(dtype)}
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred not in ('string', 'empty'):
+            raise TypeError(f"Column '{col}' holds {inferred} values; only string object columns can be snapshotted")
+        is_null = series.isna().to_numpy()
+        encoded = [b'' if null else value.encode('utf-8') for value, null in zip(series.to_numpy(dtype=object), is_null)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        _write_array(base + '.offsets.npy', offsets)
+        _write_array(base + '.mask.npy', is_null)
+        _write_array(base + '.bytes.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        return {'kind': 'string', 'dtype': str(dtype)}
+    _write_array(base + '.npy', series.to_numpy())
+    return {'kind': 'numpy', 'dtype': str(dtype)}
+
+def _load_array(path, mmap):
+    """
+    Load an .npy file, as a plain ndarray view over a read-only memory map if mmap
+    """
+    if not mmap:
+        return np.load(path)
+    return np.load(path, mmap_mode='r').view(np.ndarray)
+
+def _read_column(table_dir, col, spec, mmap, rows=None):
+    """
+    Rebuild one column, or only the rows of a slice of it, from its files;
+    fixed-width columns stay memory-mapped and strings are only decoded for rows
+    """
+    base = os.path.join(table_dir, col)
+    rows = rows if rows is not None else slice(None)
+    if spec['kind'] == 'masked':
+        values = _load_array(base + '.npy', mmap)[rows]
+        mask = _load_array(base + '.mask.npy', mmap)[rows]
+        array_type = pd.api.types.pandas_dtype(spec['dtype']).construct_array_type()
+        return array_type(values, mask)
+    if spec['kind'] == 'category':
+        codes = _load_array(base + '.npy', mmap)[rows]
+        return pd.Categorical.from_codes(codes, categories=spec['categories'], ordered=spec['ordered'])
+    if spec['kind'] == 'string':
+        offsets = _load_array(base + '.offsets.npy', True)
+        start, stop, _ = rows.indices(len(offsets) - 1)
+        offsets = offsets[start:max(start, stop) + 1]
+        nulls = _load_array(base + '.mask.npy', True)[start:stop]
+        buffer = _load_array(base + '.bytes.npy', True)[offsets[0]:offsets[-1]].tobytes()
+        offsets = (offsets - offsets[0]).tolist()
+        values = np.array([None if null else buffer[begin:end].decode('utf-8')
+                           for begin, end, null in zip(offsets[:-1], offsets[1:], nulls.tolist())], dtype=object)
+        return pd.array(values, dtype=spec['dtype']) if spec['dtype'] != 'object' else values
+    return _load_array(base + '.npy', mmap)[rows]
+
+def read_manifest(path):
+    """
+    Read a snapshot manifest, or an empty one if the snapshot does not exist yet
+    """
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {'format': SNAPSHOT_FORMAT, 'tables': {}}
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')} in {path}")
+    return manifest
+
+def _table_dir(path, name, entry):
+    # Snapshots written before generation directories kept each table in <table>/
+    return os.path.join(path, entry.get('dir', name))
+
+def _remove_dir(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+def save_snapshot(data, path, versions=None):
+    """
+    Persist a dict of table DataFrames as a columnar snapshot under path.
+
+    Each table is fingerprinted and only rewritten when the fingerprint differs
+    from the one already on disk. versions optionally maps a table name to a
+    caller-supplied version token (e.g. a max rowversion) that is used instead
+    of hashing the table contents. Returns the list of tables rewritten.
+
+    Rewritten tables are written to new generation directories and the manifest
+    is swapped in last, so readers see either the old or the new snapshot.
+    """
+    versions = versions or {}
+    os.makedirs(path, exist_ok=True)
+    manifest = read_manifest(path)
+    written = []
+    for name, df in data.items():
+        fingerprint = f"version:{versions[name]}" if name in versions else table_fingerprint(df)
+        entry = manifest['tables'].get(name)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            continue
+        generation = entry.get('generation', 0) + 1 if entry is not None else 1
+        table_dir = os.path.join(path, f'{name}.{generation}')
+        tmp_dir = table_dir + '.tmp'
+        # Leftovers of a save that crashed before its manifest was written
+        _remove_dir(tmp_dir)
+        _remove_dir(table_dir)
+        os.makedirs(tmp_dir)
+        columns = {col: _write_column(tmp_dir, col, df[col]) for col in df.columns}
+        os.replace(tmp_dir, table_dir)
+        manifest['tables'][name] = {
+            'dir': os.path.basename(table_dir),
+            'generation': generation,
+            'fingerprint': fingerprint,
+            'rows': int(len(df)),
+            'columns': columns,
+            'order': list(df.columns)
+        }
+        written.append(name)
+    if written:
+        tmp = os.path.join(path, MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(path, MANIFEST))
+    # Drop superseded generations and anything an interrupted save left behind.
+    # Only names of the snapshot's own layout are touched: '<table>.<generation>',
+    # its '.tmp' staging directory and the pre-generation '<table>' directory.
+    tables = set(manifest['tables']) | set(data)
+    live = {entry.get('dir', name) for name, entry in manifest['tables'].items()}
+    for filename in os.listdir(path):
+        match = re.fullmatch(r'(.+?)(\.\d+(\.tmp)?)?', filename)
+        if match.group(1) in tables and filename not in live:
+            _remove_dir(os.path.join(path, filename))
+    return written
+
+def _table_entry(path, name, columns, manifest):
+    """
+    Manifest entry of a table and the validated list of columns to read
+    """
+    manifest = manifest or read_manifest(path)
+    if name not in manifest['tables']:
+        raise KeyError(f"Table '{name}' is not in the snapshot at {path}")
+    entry = manifest['tables'][name]
+    columns = list(columns) if columns is not None else entry['order']
+    unknown = [col for col in columns if col not in entry['columns']]
+    if unknown:
+        raise ValueError(f"Unknown columns for table '{name}': {unknown}")
+    return entry, columns
+
+def load_table(path, name, columns=None, mmap=True, manifest=None):
+    """
+    Load one table from a snapshot, reading only the requested columns
+    """
+    entry, columns = _table_entry(path, name, columns, manifest)
+    table_dir = _table_dir(path, name, entry)
+    arrays = {col: _read_column(table_dir, col, entry['columns'][col], mmap) for col in columns}
+    return pd.DataFrame(arrays, columns=columns, copy=False)
+
+def iter_snapshot_chunks(path, name, columns=None, chunksize=50000, manifest=None):
+    """
+    Yield one table from a snapshot as DataFrames of at most chunksize rows.
+    Fixed-width columns are sliced out of their memory maps and string columns
+    are decoded one chunk at a time, so a chunk never costs the whole table.
+    """
+    entry, columns = _table_entry(path, name, columns, manifest)
+    table_dir = _table_dir(path, name, entry)
+    for start in range(0, entry['rows'], chunksize):
+        rows = slice(start, min(start + chunksize, entry['rows']))
+        arrays = {col: _read_column(table_dir, col, entry['columns'][col], True, rows) for col in columns}
+        yield pd.DataFrame(arrays, columns=columns, index=pd.RangeIndex(rows.start, rows.stop), copy=False)
+
+def load_snapshot(path, tables=None, columns=None, mmap=True):
+    """
+    Open a snapshot as the usual dict of table DataFrames.
+
+    tables restricts which tables are opened and columns maps a table name to the
+    list of columns to project, e.g. {'loans': ['BookID', 'CheckoutDate']}.
+    With mmap=True numeric and datetime columns are memory-mapped read-only views
+    of the snapshot files rather than copies.
+    """
+    manifest = read_manifest(path)
+    columns = columns or {}
+    names = list(tables) if tables is not None else list(manifest['tables'])
+    return {name: load_table(path, name, columns=columns.get(name), mmap=mmap, manifest=manifest) for name in names}
@@ -0,0 +1,114 @@
+import os
+
+from create_df import TABLE_SCHEMA, iter_table_chunks, read_table
+from incremental import CirculationAggregates
+from snapshot import iter_snapshot_chunks, load_table, read_manifest
+
+# Default cap on the memory used by one chunk and its intermediates
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+
+# Rough per-value footprint used to turn a memory budget into a chunk size:
+# fixed-width values take 8 bytes, strings are counted at an average object size
+FIXED_VALUE_BYTES = 8
+STRING_VALUE_BYTES = 64
+
+# Working memory of a chunk (groupbys, bins, masks) relative to its raw size
+CHUNK_OVERHEAD = 4
+MIN_CHUNK_ROWS = 1000
+
+# Only the columns the circulation and fine analysis needs are ever read
+LOAN_COLUMNS = ['LoanID', 'BookID', 'MemberID', 'StaffID', 'CheckoutDate', 'DueDate', 'ReturnDate', 'Status']
+FINE_COLUMNS = ['FineID', 'Amount', 'Status']
+
+# Dimension columns used to label the results
+DIMENSION_COLUMNS = {
+    'books': ['BookID', 'Title'],
+    'members': ['MemberID', 'FirstName', 'LastName'],
+    'staff': ['StaffID', 'FirstName', 'LastName']
+}
+
+def rows_per_chunk(name, columns, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Number of rows of a table that fit in memory_budget, counting each string
+    column at STRING_VALUE_BYTES and everything else at FIXED_VALUE_BYTES
+    """
+    spec = TABLE_SCHEMA[name]
+    fixed = set(spec['dates']) | set(spec['dtypes'])
+    row_bytes = sum(FIXED_VALUE_BYTES if col in fixed else STRING_VALUE_BYTES for col in columns)
+    return max(MIN_CHUNK_ROWS, int(memory_budget // (row_bytes * CHUNK_OVERHEAD)))
+
+def _is_snapshot(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _snapshot_columns(source, name, columns):
+    """
+    Map requested columns onto what a snapshot stores, e.g. Amount -> AmountCents
+    for compact snapshots
+    """
+    available = read_manifest(source)['tables'][name]['order']
+    return [col if col in available else f'{col}Cents' for col in columns]
+
+def iter_source_chunks(source, name, columns, chunksize):
+    """
+    Yield a table in chunks of at most chunksize rows from either a DB-API
+    connection or a snapshot directory (whose columns are memory-mapped, with
+    strings decoded per chunk)
+    """
+    if _is_snapshot(source):
+        yield from iter_snapshot_chunks(source, name, columns=_snapshot_columns(source, name, columns), chunksize=chunksize)
+    else:
+        yield from iter_table_chunks(source, name, columns=columns, chunksize=chunksize)
+
+def load_dimensions(source):
+    """
+    Load the small projected dimension tables used to label the results
+    """
+    if _is_snapshot(source):
+        return {name: load_table(source, name, columns=cols) for name, cols in DIMENSION_COLUMNS.items()}
+    return {name: read_table(source, name, columns=cols) for name, cols in DIMENSION_COLUMNS.items()}
+
+def stream_aggregates(source, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Fold Loans and Fines into a CirculationAggregates store chunk by chunk.
+
+    Each chunk is sized from memory_budget, so peak memory is bounded by the
+    budget plus the aggregate state (one counter entry per book, member, staff
+    member and month, and the still-open loans and pending fines).
+    """
+    store = CirculationAggregates()
+    for chunk in iter_source_chunks(source, 'loans', LOAN_COLUMNS, rows_per_chunk('loans', LOAN_COLUMNS, memory_budget)):
+        store.add_loans(chunk)
+    for chunk in iter_source_chunks(source, 'fines', FINE_COLUMNS, rows_per_chunk('fines', FINE_COLUMNS, memory_budget)):
+        store.add_fines(chunk)
+    return store
+
+def circulation_results(store, dimensions):
+    """
+    The circulation, fine and staff figures of the report from an aggregate store
+    """
+    overdue_count, overdue_percentage = store.overdue_share()
+    fines = store.fine_totals()
+    return {
+        'loans_by_month': store.monthly_circulation(),
+        'book_popularity': store.book_popularity(dimensions['books']),
+        'borrower_activity': store.borrower_activity(dimensions['members']),
+        'staff_loans': store.staff_loans(dimensions['staff']),
+        'average_loan_duration': store.average_loan_duration(),
+        'duration_distribution': store.duration_distribution(),
+        'overdue_count': overdue_count,
+        'overdue_percentage': overdue_percentage,
+        'total_fines': round(fines['total'], 2),
+        'pending_fines': round(fines['pending'], 2),
+        'collected_fines': round(fines['collected'], 2)
+    }
+
+def stream_circulation_analysis(source, memory_budget=DEFAULT_MEMORY_BUDGET, dimensions=None):
+    """
+    Out-of-core version of the report's circulation and fine sections.
+
+    source is a DB-API connection or a snapshot directory; Loans and Fines are
+    read in bounded chunks and never materialized whole. dimensions optionally
+    supplies already loaded books/members/staff frames.
+    """
+    dimensions = dimensions or load_dimensions(source)
+    return circulation_results(stream_aggregates(source, memory_budget), dimensions)
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+def _sorted(frame):
+    # Ties (equal counts) may come out in a different order on each path
+    return frame.sort_values(list(frame.columns), ignore_index=True)
+
+def _labelled(series):
+    # Only the labels and counts are reported, not the index type or name
+    return pd.Series(series.to_numpy(), index=series.index.astype(str).to_numpy())
+
+def assert_same_results(left, right):
+    """
+    Assert two dicts of report results are equal, frames compared regardless of row order
+    """
+    assert left.keys() == right.keys()
+    for key, value in left.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(_sorted(value), _sorted(right[key][value.columns]), check_dtype=False)
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(_labelled(value), _labelled(right[key]), check_dtype=False)
+        else:
+            assert value == pytest.approx(right[key], nan_ok=True)
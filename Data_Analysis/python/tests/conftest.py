@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The analysis modules live flat in Data_Analysis/python and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from create_df import get_data
+from generate_data import generate_library_data
+
+@pytest.fixture
+def sample_data():
+    return get_data()
+
+@pytest.fixture(scope='session')
+def generated_data():
+    return generate_library_data(scale=0.05, seed=1)
+
+@pytest.fixture(params=['sample_data', 'generated_data'])
+def data(request):
+    """
+    Each test using it runs on both the sample and the generated data
+    """
+    return request.getfixturevalue(request.param)
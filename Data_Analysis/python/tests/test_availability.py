@@ -0,0 +1,62 @@
+import pytest
+
+from availability import AvailabilityIndex
+
+@pytest.fixture
+def index(sample_data):
+    return AvailabilityIndex(sample_data['books'], sample_data['book_copies'])
+
+def _available(sample_data, book_id):
+    copies = sample_data['book_copies']
+    return int(((copies['BookID'] == book_id) & (copies['Status'] == 'Available')).sum())
+
+def test_checkout_and_return(sample_data, index):
+    book_id = 1
+    shelved = _available(sample_data, book_id)
+    copy_id = index.checkout(book_id=book_id)
+    assert index.available_copies(book_id) == shelved - 1
+    with pytest.raises(ValueError):
+        index.checkout(copy_id=copy_id)
+    index.return_copy(copy_id)
+    assert index.available_copies(book_id) == shelved
+    assert index.checkout(copy_id=copy_id) == copy_id
+
+def test_checkout_of_the_last_copy(index):
+    book_id = 1
+    while index.available_copies(book_id):
+        index.checkout(book_id=book_id)
+    with pytest.raises(ValueError):
+        index.checkout(book_id=book_id)
+    assert book_id not in index.available_books()['BookID'].tolist()
+
+def test_unknown_keys(index):
+    with pytest.raises(KeyError):
+        index.checkout(copy_id=10**9)
+    with pytest.raises(KeyError):
+        index.lookup(isbn='0000000000000')
+
+def test_isbn_lookup_is_normalized(sample_data, index):
+    book = sample_data['books'].iloc[0]
+    isbn = book['ISBN']
+    hyphenated = f'{isbn[:3]}-{isbn[3]}-{isbn[4:8]}-{isbn[8:12]}-{isbn[12]}'
+    assert index.lookup(isbn=hyphenated)['BookID'] == book['BookID']
+    # The ISBN-10 of a 978 ISBN-13: same nine digits with its own check digit
+    core = isbn[3:12]
+    check = sum((10 - i) * int(digit) for i, digit in enumerate(core)) % 11
+    isbn10 = core + ('X' if (11 - check) % 11 == 10 else str((11 - check) % 11))
+    assert index.lookup(isbn=isbn10)['BookID'] == book['BookID']
+
+def test_restore_and_reload(tmp_path, index):
+    before = index.snapshot()
+    borrowed = [index.checkout(book_id=book_id) for book_id in (1, 2)]
+    index.set_status(borrowed[0], 'Lost')
+    path = str(tmp_path / 'availability.json')
+    index.save(path)
+    loaded = AvailabilityIndex.load(path)
+    assert loaded.snapshot() == index.snapshot()
+    assert loaded.available_books().equals(index.available_books())
+
+    index.restore(before)
+    assert index.snapshot() == before
+    with pytest.raises(KeyError):
+        index.restore({copy_id: status for copy_id, status in list(before.items())[1:]})
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmark import compare_results, run_benchmarks
+
+def test_repeat_must_be_positive():
+    with pytest.raises(ValueError):
+        run_benchmarks(scales=(0.01,), repeat=0)
+
+def test_regressions_are_compared_per_scale():
+    results = run_benchmarks(scales=(0.01, 0.02), stages=['joins'], memory=False)
+    assert [(r['scale'], r['stage']) for r in results['stages']] == [
+        (0.01, 'generate'), (0.01, 'joins'), (0.02, 'generate'), (0.02, 'joins')]
+    assert compare_results(results, results) == []
+    slower = dict(results, stages=[dict(r, cpu_seconds=r['cpu_seconds'] * 2 + 1) for r in results['stages']])
+    regressions = compare_results(results, slower, {'wall_seconds': 100, 'peak_bytes': 100})
+    assert sorted((r['scale'], r['stage']) for r in regressions) == [
+        (0.01, 'generate'), (0.01, 'joins'), (0.02, 'generate'), (0.02, 'joins')]
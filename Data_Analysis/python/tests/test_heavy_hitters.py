@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from heavy_hitters import LoanHeavyHitters, SpaceSaving
+
+def _zipf_batches(batches=4, size=5000, keys=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.zipf(1.3, size) % keys for _ in range(batches)]
+
+def test_merged_sketch_bounds_every_count():
+    batches = _zipf_batches()
+    exact = pd.Series(np.concatenate(batches)).value_counts()
+    sketch = SpaceSaving(capacity=50)
+    for batch in batches:
+        sketch.merge(SpaceSaving(capacity=50).update(batch))
+
+    assert sketch.total == exact.sum()
+    assert len(sketch) <= 50
+    assert sketch.floor <= sketch.total / sketch.capacity
+    assert (sketch.errors <= sketch.total / sketch.capacity).all()
+    true = exact.reindex(sketch.counts.index, fill_value=0)
+    assert (sketch.counts >= true).all()
+    assert (sketch.counts - sketch.errors <= true).all()
+    # Keys that are not monitored occurred at most floor times
+    assert (exact.drop(sketch.counts.index, errors='ignore') <= sketch.floor).all()
+
+def test_guaranteed_keys_are_in_the_true_top():
+    batches = _zipf_batches(seed=1)
+    exact = pd.Series(np.concatenate(batches)).value_counts()
+    sketch = SpaceSaving(capacity=100)
+    for batch in batches:
+        sketch.update(batch)
+    top = sketch.top(10)
+    tenth = exact.iloc[9]
+    assert top['Guaranteed'].any()
+    assert (exact[top.loc[top['Guaranteed'], 'Key']] >= tenth).all()
+
+def test_large_sketches_are_exact(tmp_path, generated_data):
+    loans = generated_data['loans']
+    half = len(loans) // 2
+    left = LoanHeavyHitters(generated_data['book_categories'], generated_data['book_authors'], capacity=10**6)
+    right = LoanHeavyHitters(generated_data['book_categories'], generated_data['book_authors'], capacity=10**6)
+    left.add_loans(loans.iloc[:half])
+    right.add_loans(loans.iloc[half:])
+    left.merge(right)
+
+    path = str(tmp_path / 'sketches.json')
+    left.save(path)
+    sketches = LoanHeavyHitters.load(path, generated_data['book_categories'], generated_data['book_authors'])
+    top = sketches.top_books(generated_data['books'], n=20)
+    exact = loans['BookID'].value_counts()
+    assert (top['Error'] == 0).all()
+    assert top['Borrows'].tolist() == exact.head(20).tolist()
+    assert (exact[top['BookID']].to_numpy() == top['Borrows'].to_numpy()).all()
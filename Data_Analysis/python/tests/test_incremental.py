@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from incremental import CirculationAggregates
+from streaming import circulation_results
+
+from compare import assert_same_results
+
+def _replay(data, chunks=4):
+    """
+    Build a store the way the desk would: returned loans are first added as
+    Borrowed, their fines as Pending, and both are then moved to their final
+    state through update_loans/update_fines
+    """
+    loans, fines = data['loans'], data['fines']
+    returned = (loans['Status'] == 'Returned').to_numpy()
+    opened = loans.copy()
+    opened.loc[returned, 'Status'] = 'Borrowed'
+    opened.loc[returned, 'ReturnDate'] = pd.NaT
+
+    store = CirculationAggregates()
+    for chunk in np.array_split(np.arange(len(opened)), chunks):
+        store.add_loans(opened.iloc[chunk])
+    issued = store.update_loans(loans.loc[returned, ['LoanID', 'Status', 'ReturnDate']])
+    store.add_fines(fines.assign(Status='Pending'))
+    settled = fines[fines['Status'] != 'Pending']
+    store.update_fines(settled[['FineID', 'Status']])
+    return store, issued
+
+def test_incremental_matches_full_recompute(data):
+    store, _ = _replay(data)
+    full = CirculationAggregates.from_data(data)
+    assert_same_results(circulation_results(store, data), circulation_results(full, data))
+    pd.testing.assert_frame_equal(store.open_loans.sort_index(), full.open_loans.sort_index())
+    pd.testing.assert_series_equal(store.open_fines.sort_index(), full.open_fines.sort_index())
+
+def test_update_loans_issues_the_recorded_fines(generated_data):
+    _, issued = _replay(generated_data)
+    loans, fines = generated_data['loans'], generated_data['fines']
+    returned_ids = loans.loc[loans['Status'] == 'Returned', 'LoanID']
+    recorded = fines[fines['LoanID'].isin(returned_ids)]
+    expected = recorded[['LoanID', 'Amount']].sort_values('LoanID', ignore_index=True)
+    actual = issued[['LoanID', 'Amount']].sort_values('LoanID', ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+def test_save_and_load_round_trip(tmp_path, sample_data):
+    store = CirculationAggregates.from_data(sample_data)
+    path = str(tmp_path / 'aggregates.json')
+    store.save(path)
+    assert_same_results(circulation_results(CirculationAggregates.load(path), sample_data),
+                        circulation_results(store, sample_data))
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from create_df import compact_table, load_dataframes_from_db, write_dataframes_to_db
+from snapshot import load_snapshot, save_snapshot
+
+def _as_loaded(df, loaded):
+    # SQLite hands dates back at its own datetime resolution; compare the values
+    units = {col: dtype for col, dtype in loaded.dtypes.items() if dtype.kind == 'M'}
+    return df.astype(units)
+
+@pytest.fixture
+def sqlite_conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize('dataset', ['sample_data', 'generated_data'])
+@pytest.mark.parametrize('chunksize', [500, 50000])
+def test_db_round_trip(request, sqlite_conn, dataset, chunksize):
+    data = request.getfixturevalue(dataset)
+    write_dataframes_to_db(data, sqlite_conn)
+    loaded = load_dataframes_from_db(sqlite_conn, chunksize=chunksize)
+    assert list(loaded) == list(data)
+    for name, df in data.items():
+        pd.testing.assert_frame_equal(loaded[name], _as_loaded(df, loaded[name]))
+
+def test_db_round_trip_keeps_types_of_chunks_with_null_columns(sqlite_conn, sample_data):
+    # One-row chunks leave nullable text columns entirely NULL in some chunks
+    write_dataframes_to_db(sample_data, sqlite_conn)
+    loaded = load_dataframes_from_db(sqlite_conn, chunksize=1)
+    for name, df in sample_data.items():
+        pd.testing.assert_frame_equal(loaded[name], df)
+
+def test_db_projection(sqlite_conn, sample_data):
+    write_dataframes_to_db(sample_data, sqlite_conn)
+    loaded = load_dataframes_from_db(sqlite_conn, tables=['loans'], columns={'loans': ['LoanID', 'CheckoutDate']})
+    assert list(loaded) == ['loans']
+    pd.testing.assert_frame_equal(loaded['loans'], sample_data['loans'][['LoanID', 'CheckoutDate']])
+
+def test_db_without_optional_tables(sqlite_conn, sample_data):
+    required = {name: df for name, df in sample_data.items() if name not in ('book_reviews', 'fine_payments')}
+    write_dataframes_to_db(required, sqlite_conn)
+    assert list(load_dataframes_from_db(sqlite_conn)) == list(required)
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_snapshot_round_trip(tmp_path, generated_data, compact):
+    data = {name: compact_table(df, name) for name, df in generated_data.items()} if compact else generated_data
+    assert save_snapshot(data, tmp_path) == list(data)
+    assert save_snapshot(data, tmp_path) == []
+    loaded = load_snapshot(tmp_path)
+    for name, df in data.items():
+        pd.testing.assert_frame_equal(loaded[name], df)
+
+def test_snapshot_cleanup_keeps_unrelated_directories(tmp_path, sample_data):
+    data = {'loans': sample_data['loans']}
+    save_snapshot(data, tmp_path)
+    for name in ('loans_archive', 'loans.backup', 'loans.1.old', 'loans.7.tmp'):
+        (tmp_path / name).mkdir()
+    save_snapshot({'loans': sample_data['loans'].head(3)}, tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == [
+        'loans.1.old', 'loans.2', 'loans.backup', 'loans_archive']
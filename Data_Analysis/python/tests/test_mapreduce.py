@@ -0,0 +1,28 @@
+import pytest
+
+from mapreduce import partition_data, run_consortium_analysis
+
+from compare import assert_same_results
+
+@pytest.mark.parametrize('key', ['MemberID', 'BookID'])
+@pytest.mark.parametrize('dataset', ['sample_data', 'generated_data'])
+def test_partitions_merge_into_the_unpartitioned_result(request, dataset, key):
+    data = request.getfixturevalue(dataset)
+    whole = run_consortium_analysis({'library': data}, workers=1, partitioned=True)
+    parts = run_consortium_analysis(dict(enumerate(partition_data(data, key, 3))), workers=1, partitioned=True)
+    assert_same_results(whole, parts)
+    assert whole['borrower_activity']['MemberID'].is_unique
+    assert parts['staff_loans']['StaffID'].is_unique
+
+def test_branches_keep_their_own_members(sample_data):
+    report = run_consortium_analysis({'north': sample_data, 'south': sample_data}, workers=1)
+    activity = report['borrower_activity']
+    assert sorted(activity['Branch'].unique()) == ['north', 'south']
+    assert len(activity) == 2 * sample_data['members']['MemberID'].nunique()
+
+def test_partitions_carry_only_what_the_map_step_reads(generated_data):
+    parts = partition_data(generated_data, 'MemberID', 4)
+    assert all(set(part) == {'books', 'members', 'staff', 'loans', 'fines'} for part in parts)
+    assert sum(len(part['loans']) for part in parts) == len(generated_data['loans'])
+    assert sum(len(part['fines']) for part in parts) == len(generated_data['fines'])
+    assert list(parts[0]['books'].columns) == ['BookID', 'Title']
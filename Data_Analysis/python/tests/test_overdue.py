@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from overdue import OverdueNoticeEngine
+
+def _loans(due_dates, statuses=None):
+    count = len(due_dates)
+    return pd.DataFrame({
+        'LoanID': range(1, count + 1),
+        'BookID': [1] * count,
+        'MemberID': range(1, count + 1),
+        'CheckoutDate': pd.to_datetime(['2024-01-01'] * count),
+        'DueDate': pd.to_datetime(due_dates, format='ISO8601'),
+        'ReturnDate': pd.NaT,
+        'Status': statuses or ['Borrowed'] * count
+    })
+
+def test_prefix_boundaries(sample_data):
+    now = pd.Timestamp('2024-02-10 00:01')
+    loans = _loans(['2024-02-10 00:01', '2024-02-10 00:00:59.999999999', '2024-02-09 23:59',
+                    '2024-02-10 00:02', '2024-01-31 12:00'])
+    engine = OverdueNoticeEngine(loans, sample_data['members'], sample_data['books'])
+    # DueDate == now is not overdue yet; a nanosecond earlier is
+    assert engine.overdue_count(now) == 3
+    overdue = engine.overdue_loans(now).set_index('LoanID')
+    assert sorted(overdue.index) == [2, 3, 5]
+    # DATEDIFF counts calendar-day boundaries: due earlier today is 0 days, late last night 1
+    assert overdue['DaysOverdue'].to_dict() == {5: 10, 3: 1, 2: 0}
+    assert engine.overdue_count(pd.Timestamp('2024-01-01')) == 0
+    assert engine.overdue_count(pd.Timestamp('2025-01-01')) == len(loans)
+
+def test_matches_a_brute_force_filter(generated_data):
+    loans = generated_data['loans']
+    engine = OverdueNoticeEngine(loans, generated_data['members'], generated_data['books'])
+    open_loans = loans[loans['ReturnDate'].isna()]
+    for now in map(pd.Timestamp, ['2021-06-01', '2023-03-15 12:30', '2024-01-01', '2030-01-01']):
+        expected = open_loans.loc[open_loans['DueDate'] < now, 'LoanID']
+        assert engine.overdue_count(now) == len(expected)
+        assert sorted(engine.overdue_loans(now)['LoanID']) == sorted(expected)
+
+@pytest.mark.parametrize('members_per_batch', [1, 2, 500])
+def test_mark_overdue_and_notice_batches(generated_data, members_per_batch):
+    loans = generated_data['loans']
+    engine = OverdueNoticeEngine(loans, generated_data['members'], generated_data['books'])
+    now = pd.Timestamp('2024-01-01')
+    flipped = engine.mark_overdue(now)
+    open_loans = loans[loans['ReturnDate'].isna()]
+    due = open_loans[(open_loans['DueDate'] < now) & (open_loans['Status'] == 'Borrowed')]
+    assert sorted(flipped['LoanID']) == sorted(due['LoanID'])
+    assert engine.mark_overdue(now).empty
+    assert (engine.overdue_loans(now)['Status'] != 'Borrowed').all()
+
+    batches = list(engine.notice_batches(now, members_per_batch=members_per_batch))
+    assert sum(len(batch) for batch in batches) == engine.overdue_count(now)
+    seen = set()
+    for batch in batches:
+        members = set(batch['MemberID'])
+        assert len(members) <= members_per_batch and not members & seen
+        seen |= members
+
+def test_returned_loans_are_dropped(sample_data):
+    engine = OverdueNoticeEngine(_loans(['2024-01-05', '2024-01-06']), sample_data['members'], sample_data['books'])
+    engine.return_loans([1])
+    assert len(engine) == 1
+    assert engine.overdue_loans('2024-02-01')['LoanID'].tolist() == [2]
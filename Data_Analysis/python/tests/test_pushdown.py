@@ -0,0 +1,31 @@
+import sqlite3
+
+import pytest
+
+from create_df import compact_dataframes, write_dataframes_to_db
+from pushdown import SqlBackend, check_parity, create_report_indexes
+from some_visualization import PandasBackend
+
+@pytest.mark.parametrize('dataset', ['sample_data', 'generated_data'])
+def test_sql_backend_matches_pandas(request, dataset):
+    data = request.getfixturevalue(dataset)
+    conn = sqlite3.connect(':memory:')
+    try:
+        write_dataframes_to_db(data, conn)
+        create_report_indexes(conn)
+        assert check_parity(PandasBackend(data), SqlBackend(conn)) == []
+    finally:
+        conn.close()
+
+def test_sql_backend_without_optional_tables(sample_data):
+    data = {name: df for name, df in sample_data.items() if name not in ('book_reviews', 'fine_payments')}
+    conn = sqlite3.connect(':memory:')
+    try:
+        write_dataframes_to_db(data, conn)
+        assert check_parity(PandasBackend(data), SqlBackend(conn)) == []
+    finally:
+        conn.close()
+
+def test_parity_ignores_category_order(generated_data):
+    compact = compact_dataframes(generated_data)
+    assert check_parity(PandasBackend(generated_data), PandasBackend(compact)) == []
@@ -0,0 +1,49 @@
+import sqlite3
+
+import numpy as np
+
+from create_df import load_dataframes_from_db, write_dataframes_to_db
+from ratings import RatingAggregates
+
+def _approved_counts(reviews):
+    approved = reviews[reviews['IsApproved'].fillna(False).astype(bool)]
+    return approved.groupby('BookID').size()
+
+def _review_counts(store, books):
+    ratings = store.book_ratings(books)
+    counts = ratings.set_index('BookID')['ReviewCount']
+    return counts[counts > 0]
+
+def test_null_approval_is_not_counted(sample_data):
+    conn = sqlite3.connect(':memory:')
+    try:
+        write_dataframes_to_db(sample_data, conn)
+        conn.execute("UPDATE BookReviews SET IsApproved = NULL WHERE ReviewID IN (1, 2)")
+        data = load_dataframes_from_db(conn)
+    finally:
+        conn.close()
+    store = RatingAggregates.from_data(data)
+    assert {1, 2} <= set(store.pending.index)
+    assert _review_counts(store, data['books']).to_dict() == _approved_counts(data['book_reviews']).to_dict()
+
+def test_moderation_events(tmp_path, generated_data):
+    reviews = generated_data['book_reviews']
+    store = RatingAggregates.from_data(generated_data)
+    waiting = reviews.loc[~reviews['IsApproved'], 'ReviewID'].to_numpy()
+    approved, rejected = waiting[::2], waiting[1::2]
+    assert store.approve(approved) == len(approved)
+    assert store.approve(approved) == 0
+    store.reject(rejected)
+    assert store.pending.empty
+
+    expected = reviews.assign(IsApproved=reviews['IsApproved'] | reviews['ReviewID'].isin(approved))
+    expected = expected[~expected['ReviewID'].isin(rejected)]
+    assert _review_counts(store, generated_data['books']).to_dict() == _approved_counts(expected).to_dict()
+
+    path = str(tmp_path / 'ratings.json')
+    store.save(path)
+    loaded = RatingAggregates.load(path)
+    assert np.array_equal(loaded.histogram, store.histogram)
+
+    store.remove_reviews(expected.head(100))
+    assert _review_counts(store, generated_data['books']).to_dict() == _approved_counts(expected.iloc[100:]).to_dict()
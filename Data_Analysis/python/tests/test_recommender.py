@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender import AUTHOR_BOOST, CATEGORY_BOOST, CoBorrowRecommender
+
+# Members 1-4 borrowing books 10-40; books 10 and 30 share a category, 20 and 30 an author
+LOANS = pd.DataFrame({
+    'MemberID': [1, 1, 2, 2, 2, 3, 3, 4, 4],
+    'BookID': [10, 20, 10, 20, 30, 30, 40, 10, 10]
+})
+BOOK_CATEGORIES = pd.DataFrame({'BookID': [10, 20, 30, 40], 'CategoryID': [1, 2, 1, 3]})
+BOOK_AUTHORS = pd.DataFrame({'BookID': [10, 20, 30, 40], 'AuthorID': [5, 7, 7, 8]})
+BOOKS = pd.DataFrame({'BookID': [10, 20, 30, 40], 'Title': ['Ten', 'Twenty', 'Thirty', 'Forty']})
+
+# Cosine of the borrower sets: 10 has 3 borrowers, 20 and 30 two, 40 one
+SIMILARITY = {
+    (10, 20): 2 / np.sqrt(3 * 2),
+    (10, 30): 1 / np.sqrt(3 * 2) * (1 + CATEGORY_BOOST),
+    (20, 30): 1 / np.sqrt(2 * 2) * (1 + AUTHOR_BOOST),
+    (30, 40): 1 / np.sqrt(2 * 1)
+}
+
+def _similarity(left, right):
+    return SIMILARITY.get((left, right), SIMILARITY.get((right, left), 0.0))
+
+@pytest.fixture(params=[None, 1], ids=['one-block', 'one-book-blocks'])
+def recommender(request):
+    # max_pairs=1 builds the neighbour table one book at a time
+    options = {} if request.param is None else {'max_pairs': request.param}
+    return CoBorrowRecommender.build(LOANS, BOOK_CATEGORIES, BOOK_AUTHORS, **options)
+
+def test_neighbours_are_ranked_by_similarity(recommender):
+    for book_id in [10, 20, 30, 40]:
+        neighbours = recommender.similar_books(book_id)
+        expected = sorted(((other, _similarity(book_id, other)) for other in [10, 20, 30, 40]
+                           if other != book_id and _similarity(book_id, other) > 0), key=lambda item: -item[1])
+        assert neighbours['BookID'].tolist() == [other for other, _ in expected]
+        assert np.allclose(neighbours['Score'], [score for _, score in expected])
+
+def test_recommendations_sum_similarity_to_unseen_books(recommender):
+    picks = recommender.recommend(1, books=BOOKS)
+    assert picks['BookID'].tolist() == [30]
+    assert picks['Title'].tolist() == ['Thirty']
+    assert picks['Score'].iloc[0] == pytest.approx(_similarity(10, 30) + _similarity(20, 30))
+    assert recommender.recommend(4)['BookID'].tolist() == [20, 30]
+    assert recommender.recommend(4, n=1)['BookID'].tolist() == [20]
+    assert recommender.recommend(99).empty
+
+def test_neighbour_count_and_reload(tmp_path):
+    recommender = CoBorrowRecommender.build(LOANS, BOOK_CATEGORIES, BOOK_AUTHORS, neighbours=1)
+    assert recommender.similar_books(30)['BookID'].tolist() == [20]
+    path = str(tmp_path / 'recommender.npz')
+    recommender.save(path)
+    loaded = CoBorrowRecommender.load(path)
+    pd.testing.assert_frame_equal(loaded.recommend(4), recommender.recommend(4))
+    with pytest.raises(KeyError):
+        loaded.similar_books(99)
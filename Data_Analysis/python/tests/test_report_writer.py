@@ -0,0 +1,21 @@
+import io
+
+import pandas as pd
+import pytest
+
+from report_writer import MarkdownWriter, ReportWriter
+
+def test_incomplete_writer_fails_on_creation():
+    class HeadingsOnly(ReportWriter):
+        def heading(self, text, level=2):
+            self.write(text)
+
+    with pytest.raises(TypeError):
+        HeadingsOnly(io.StringIO())
+
+def test_markdown_writer_limits_bullets():
+    out = io.StringIO()
+    with MarkdownWriter(out, top_n=2) as writer:
+        items, omitted = writer.limit(pd.Series(['a', 'b', 'c']))
+        writer.bullets(items, omitted)
+    assert out.getvalue() == '- a\n- b\n- ... and 1 more\n'
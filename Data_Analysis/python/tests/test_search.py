@@ -0,0 +1,47 @@
+import numpy as np
+
+from search import CatalogIndex, tokenize
+
+def test_search_matches_a_brute_force_scan(generated_data):
+    index = CatalogIndex.from_data(generated_data)
+    results = index.search('fiction mystery', n=25)
+    assert len(results) == 25
+    assert np.all(np.diff(results['Score'].to_numpy()) <= 0)
+    # Every result holds a query term, and nothing outside the results outranks the last one
+    for book_id in results['BookID'].tolist():
+        assert {'fiction', 'mystery'} & set(index._terms_of(book_id))
+    everything = index.search('fiction mystery', n=len(index))
+    assert set(results['BookID']) <= set(everything['BookID'])
+    assert everything['Score'].iloc[25] <= results['Score'].iloc[-1]
+
+def test_prefix_matches_the_last_word_only(sample_data):
+    index = CatalogIndex.from_data(sample_data)
+    assert not index.search('harr', prefix=False).size
+    assert "Harry Potter and the Philosopher's Stone" in index.search('harr')['Title'].tolist()
+
+def test_updates_are_searchable_before_and_after_save(tmp_path, sample_data):
+    index = CatalogIndex.from_data(sample_data)
+    index.add_document(99, {'Title': 'Zebra Crossings'}, isbn='978-0-00-000000-2', title='Zebra Crossings')
+    assert index.search('zebra')['BookID'].tolist() == [99]
+    assert index.search('9780000000002')['BookID'].tolist() == [99]
+    index.remove(sample_data['books']['BookID'].iloc[0])
+
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = CatalogIndex.load(path)
+    assert len(loaded) == len(index)
+    for query in ['zebra', 'the', 'harry pot']:
+        assert loaded.search(query)['BookID'].tolist() == index.search(query)['BookID'].tolist()
+    loaded.remove(99)
+    assert loaded.search('zebra').empty
+
+def test_empty_title_survives_save(tmp_path):
+    index = CatalogIndex()
+    index.add_document(1, {'Description': 'untitled'}, title='')
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    assert CatalogIndex.load(path).search('untitled')['Title'].tolist() == ['']
+
+def test_tokenize_ignores_nulls():
+    assert tokenize(None) == []
+    assert tokenize('Hello, World_2') == ['hello', 'world', '2']
@@ -0,0 +1,32 @@
+import sqlite3
+
+from create_df import write_dataframes_to_db
+from snapshot import save_snapshot
+from some_visualization import PandasBackend
+from streaming import stream_circulation_analysis
+
+from compare import assert_same_results
+
+# A budget small enough that every table is read in several chunks
+SMALL_BUDGET = 2**18
+
+def _report_sections(data):
+    """
+    The report's circulation, overdue, fine and staff sections, computed in pandas
+    """
+    backend = PandasBackend(data)
+    return dict(backend.circulation(), staff_loans=backend.staff(), **backend.overdue(), **backend.fines())
+
+def test_streaming_from_db_matches_the_report(data):
+    conn = sqlite3.connect(':memory:')
+    try:
+        write_dataframes_to_db(data, conn)
+        streamed = stream_circulation_analysis(conn, memory_budget=SMALL_BUDGET)
+    finally:
+        conn.close()
+    assert_same_results(_report_sections(data), streamed)
+
+def test_streaming_from_snapshot_matches_the_report(tmp_path, data):
+    save_snapshot(data, tmp_path)
+    streamed = stream_circulation_analysis(str(tmp_path), memory_budget=SMALL_BUDGET)
+    assert_same_results(_report_sections(data), streamed)
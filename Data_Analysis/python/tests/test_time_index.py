@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_index import TimeIndex, last_days, month_window, year_window
+
+@pytest.fixture(scope='module')
+def index(generated_data):
+    return TimeIndex.from_data(generated_data)
+
+def _windows(times):
+    """
+    Random windows over a column's range plus the edge cases: open ends, a
+    window starting exactly on a value, and an empty (reversed) window
+    """
+    rng = np.random.default_rng(0)
+    present = times.dropna().sort_values()
+    low, high = present.iloc[0], present.iloc[-1]
+    picks = [low + (high - low) * fraction for fraction in rng.random((10, 2))]
+    windows = [tuple(sorted(pair)) for pair in picks]
+    return windows + [(None, None), (None, present.iloc[5]), (present.iloc[5], None),
+                      (present.iloc[5], present.iloc[5]), (high, low)]
+
+@pytest.mark.parametrize('table, name', [('loans', 'CheckoutDate'), ('loans', 'ReturnDate'),
+                                         ('fines', 'PaymentDate'), ('reservations', 'ExpiryDate')])
+def test_window_counts_match_a_brute_force_filter(generated_data, index, table, name):
+    times = generated_data[table][name]
+    for start, end in _windows(times):
+        mask = times.notna()
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        assert index.count(table, name, start, end) == mask.sum()
+
+def test_window_totals_match_a_brute_force_filter(generated_data, index):
+    fines = generated_data['fines']
+    for start, end in _windows(fines['IssuedDate']):
+        mask = fines['IssuedDate'].between(start or pd.Timestamp.min, end or pd.Timestamp.max)
+        assert index.total('fines', 'IssuedDate', 'Amount', start, end) == pytest.approx(fines.loc[mask, 'Amount'].sum())
+
+def test_calendar_windows(generated_data, index):
+    checkout = generated_data['loans']['CheckoutDate']
+    year = int(checkout.dt.year.mode().iloc[0])
+    monthly = index.monthly_counts('loans', 'CheckoutDate', year)
+    expected = checkout[checkout.dt.year == year].dt.month.value_counts().reindex(range(1, 13), fill_value=0)
+    assert monthly['Count'].tolist() == expected.tolist()
+    assert index.count('loans', 'CheckoutDate', *year_window(year)) == (checkout.dt.year == year).sum()
+    march = (checkout.dt.year == year) & (checkout.dt.month == 3)
+    assert index.count('loans', 'CheckoutDate', *month_window(year, 3)) == march.sum()
+    now = checkout.max()
+    start, end = last_days(30, now)
+    assert index.count('loans', 'CheckoutDate', *last_days(30, now)) == checkout.between(start, end).sum()
+
+def test_unknown_columns(index):
+    with pytest.raises(KeyError):
+        index.count('loans', 'LoanID')
+    with pytest.raises(KeyError):
+        index.total('loans', 'CheckoutDate', 'Amount')
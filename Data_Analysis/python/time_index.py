@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from create_df import money_column
+
+# Datetime columns indexed per table; tables missing from the data dict are skipped
+TIME_COLUMNS = {
+    'loans': ['CheckoutDate', 'DueDate', 'ReturnDate'],
+    'fines': ['IssuedDate', 'PaymentDate'],
+    'reservations': ['ReservationDate', 'ExpiryDate'],
+    'fine_payments': ['PaymentDate']
+}
+
+# Money columns with prefix sums, so window totals are a subtraction as well
+VALUE_COLUMNS = {
+    'fines': ['Amount'],
+    'fine_payments': ['PaymentAmount']
+}
+
+def _timestamp(value):
+    return np.datetime64(pd.Timestamp(value), 'ns')
+
+class SortedTimeColumn:
+    """
+    One datetime column as a sorted datetime64 array (nulls dropped), with
+    prefix sums of any value columns in the same order. A window [start, end]
+    is two binary searches; its count and totals are subtractions.
+    """
+
+    def __init__(self, times, values=None):
+        times = pd.Series(pd.to_datetime(times)).to_numpy(dtype='datetime64[ns]')
+        present = np.flatnonzero(~np.isnat(times))
+        order = present[np.argsort(times[present], kind='stable')]
+        self.times = times[order]
+        # Row positions in the source table, in time order
+        self.rows = order
+        self.prefix = {}
+        for name, column in (values or {}).items():
+            column = np.nan_to_num(np.asarray(column, dtype='float64')[order])
+            self.prefix[name] = np.concatenate([[0.0], np.cumsum(column)])
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self, start=None, end=None):
+        """
+        Positions [lo, hi) of the values with start <= time <= end (BETWEEN semantics)
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.times, _timestamp(start), side='left'))
+        hi = len(self.times) if end is None else int(np.searchsorted(self.times, _timestamp(end), side='right'))
+        return lo, max(lo, hi)
+
+    def count(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def total(self, value, start=None, end=None):
+        if value not in self.prefix:
+            raise KeyError(f"No prefix sums for '{value}'. Available: {list(self.prefix)}")
+        lo, hi = self.bounds(start, end)
+        return float(self.prefix[value][hi] - self.prefix[value][lo])
+
+    def window_rows(self, start=None, end=None):
+        """
+        Source row positions inside the window, in time order
+        """
+        lo, hi = self.bounds(start, end)
+        return self.rows[lo:hi]
+
+    def counts_between(self, edges):
+        """
+        Counts in consecutive half-open buckets [edges[i], edges[i+1]), found
+        with one vectorized binary search
+        """
+        edges = pd.to_datetime(pd.Series(edges)).to_numpy(dtype='datetime64[ns]')
+        return np.diff(np.searchsorted(self.times, edges, side='left'))
+
+class TimeIndex:
+    """
+    Sorted time indexes over the datetime columns of Loans, Fines, Reservations
+    and FinePayments, for rolling-window statistics that never rescan a table.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_data(cls, data, time_columns=TIME_COLUMNS):
+        columns = {}
+        for table, names in time_columns.items():
+            if table not in data:
+                continue
+            frame = data[table]
+            values = {value: money_column(frame, value) for value in VALUE_COLUMNS.get(table, [])}
+            for name in names:
+                columns[(table, name)] = SortedTimeColumn(frame[name], values)
+        return cls(columns)
+
+    def column(self, table, name):
+        if (table, name) not in self.columns:
+            raise KeyError(f"{table}.{name} is not indexed. Indexed columns: {sorted(self.columns)}")
+        return self.columns[(table, name)]
+
+    def count(self, table, name, start=None, end=None):
+        return self.column(table, name).count(start, end)
+
+    def total(self, table, name, value, start=None, end=None):
+        return self.column(table, name).total(value, start, end)
+
+    def monthly_counts(self, table, name, year):
+        """
+        Counts per calendar month of one year, like GetMonthlyCirculationStats
+        """
+        edges = pd.date_range(f'{year}-01-01', periods=13, freq='MS')
+        counts = self.column(table, name).counts_between(edges)
+        return pd.DataFrame({'Year': year, 'Month_Num': np.arange(1, 13), 'Count': counts})
+
+def last_days(days, now=None):
+    """
+    Window of the last `days` days, as in DATEADD(DAY, -days, GETDATE())
+    """
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    return now - pd.Timedelta(days=days), now
+
+def month_window(year, month):
+    """
+    Window covering one calendar month
+    """
+    start = pd.Timestamp(year=year, month=month, day=1)
+    return start, start + pd.offsets.MonthBegin(1) - pd.Timedelta(1, 'ns')
+
+def year_window(year):
+    """
+    Window covering one calendar year, as in YEAR(CheckoutDate) = @Year
+    """
+    start = pd.Timestamp(year=year, month=1, day=1)
+    return start, pd.Timestamp(year=year + 1, month=1, day=1) - pd.Timedelta(1, 'ns')
+
+def year_to_date(now=None):
+    """
+    Window from January 1st of the current year up to now
+    """
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    return pd.Timestamp(year=now.year, month=1, day=1), now